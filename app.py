@@ -1,22 +1,61 @@
 from flask import Flask, render_template, request, redirect, url_for, flash
 from datamanager.sqlite_data_manager import SQLiteDataManager
-from datamanager import data_manager
 from database import Base, engine
 from models.user import User
-from models.movie import Movie
 from models.review import Review
 from email_validator import validate_email, EmailNotValidError
-from sqlalchemy.orm.exc import NoResultFound
-from flask import Flask, jsonify, request
+from sqlalchemy.exc import IntegrityError
+from flask import jsonify, Response, abort, send_file
+from datamanager.export import EXPORT_FORMATS, encode_export
+from datamanager.sqlite_data_manager import EXPORT_DATASETS, DETAILS_BATCH_LIMIT
+from datamanager.omdb import QuotaExceeded, BACKGROUND
+from datamanager import migrations
+from datamanager.backup import (BACKUP_DIR, BACKUP_KEEP, BACKUP_PAGES, BACKUP_PAUSE, BackupScheduler,
+                                backup_database, list_snapshots, restore_database, verify_snapshot)
+from assets import TEMPLATE_CACHE_DIR, StaticAssets, enable_bytecode_cache, precompile_templates
+from profiling import PROFILE_DIR, PROFILE_HEADER, PROFILE_INTERVAL, RequestProfiler
+import click
+import os
+import sys
+import time
 import uuid
 
 
 app = Flask(__name__)
 app.secret_key = "mysecretkey123"
+# Let a fronting nginx/Apache send files (posters) with X-Sendfile
+app.config['USE_X_SENDFILE'] = os.environ.get('MOVIEWEB_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+# Poster thumbnails are content-addressed, so versioned links never go stale
+POSTER_MAX_AGE = 365 * 24 * 3600
+
+# Compiled templates are kept on disk for all workers, and static files are
+# served fingerprinted and pre-compressed from /assets/ once built
+enable_bytecode_cache(app, os.environ.get('MOVIEWEB_TEMPLATE_CACHE', TEMPLATE_CACHE_DIR))
+static_assets = StaticAssets(app)
 
 # Initialize your SQLiteDataManager with the appropriate database URI
 data_manager = SQLiteDataManager("sqlite:///movieweb.db")
 
+# Opt-in request profiling: MOVIEWEB_PROFILE=1 profiles every request,
+# MOVIEWEB_PROFILE_RATE=0.01 one in a hundred, and with MOVIEWEB_PROFILE_SECRET
+# set any request carrying an X-Profile token from `flask profile-token`
+profiler = None
+if any(os.environ.get(name) for name in ('MOVIEWEB_PROFILE', 'MOVIEWEB_PROFILE_RATE', 'MOVIEWEB_PROFILE_SECRET')):
+    profiler = RequestProfiler(
+        app,
+        output_dir=os.environ.get('MOVIEWEB_PROFILE_DIR', PROFILE_DIR),
+        rate=float(os.environ.get('MOVIEWEB_PROFILE_RATE', 0)),
+        interval=float(os.environ.get('MOVIEWEB_PROFILE_INTERVAL', PROFILE_INTERVAL)),
+        secret=os.environ.get('MOVIEWEB_PROFILE_SECRET'),
+        always=os.environ.get('MOVIEWEB_PROFILE', '').lower() in ('1', 'true', 'yes'),
+    )
+
+@app.teardown_appcontext
+def shutdown_session(exception=None):
+    """End the request's database session so every thread and worker starts clean."""
+    data_manager.close_session()
+
 def generate_unique_id():
     return str(uuid.uuid4())
 
@@ -56,18 +95,22 @@ def add_user():
             flash("Invalid email address", "error")
             return redirect('/add_user')  # Redirect back to the add_user page
 
-        # Create a new user instance
-        new_user = User(name=name, email=email)
-
-        # Add the new user instance to the session
-        data_manager.add_user(new_user)
-
         # Check for existing email
         existing_user = data_manager.get_user_by_email(email)
         if existing_user:
             flash("Email already exists", "error")
             return redirect('/add_user')
 
+        # Create a new user instance
+        new_user = User(name=name, email=email)
+
+        # Add the new user to the database
+        try:
+            data_manager.add_user(new_user)
+        except IntegrityError:
+            flash("Email already exists", "error")
+            return redirect('/add_user')
+
 
         flash("User added successfully", "success")
         return redirect('/users')  # Redirect to the users list page
@@ -104,7 +147,8 @@ def user_movies(user_id):
         print("User ID:", user_id)
         print("User Name:", user_name)
         print("Movies:", movies)
-        return render_template('user_movie.html', user_id=user_id, user_name=user_name, movies=movies, user=user)
+        return render_template('user_movie.html', user_id=user_id, user_name=user_name, movies=movies, user=user,
+                               details_batch_limit=DETAILS_BATCH_LIMIT)
     except Exception as e:
         print("Error in user_movies route:", e)
         return render_template('error.html', error=str(e))
@@ -131,17 +175,17 @@ def add_movie(user_id):
       genre = request.form['genre']
       
       try:
-        # Fetch movie details from the OMDB API
-        movie_details = data_manager.get_movie_details_by_name(name)
-        
-        if not movie_details:
-            flash("Movie not found in OMDB API", "error")
-            return redirect(url_for('add_movie', user_id=user_id))
-        
-        # Add the movie to the user's collection
-        data_manager.add_movie(user_id, movie_details['Title'], genre)
+        # Add the movie to the user's collection; OMDb is only asked about titles
+        # that are not in the shared catalog yet
+        data_manager.add_movie(user_id, name, genre)
         flash("The movie has been added", "success")
         return redirect(url_for('user_movies', user_id=user_id))
+      except QuotaExceeded as e:
+        flash(f"{str(e)} (retry in {e.retry_after} seconds)", "error")
+        return redirect(url_for('add_movie', user_id=user_id))
+      except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for('add_movie', user_id=user_id))
       except Exception as e:
         flash(f"Error adding movie: {str(e)}", "error")
         return redirect(url_for('add_movie', user_id=user_id))
@@ -232,6 +276,28 @@ def add_review(user_id, movie_id):
         movie = data_manager.get_movie(movie_id)
         return render_template('add_review.html', user_id=user_id, user_name=user_name, movie=movie)
 
+def get_own_review(user_id, movie_id, review_id):
+    """
+    Load a review for editing, aborting unless the user wrote it for this movie.
+
+    The review thread of a movie lists every user's reviews, so the review ID in
+    the URL may belong to somebody else.
+
+    Args:
+        user_id (str): The ID of the user.
+        movie_id (str): The ID of the user's movie.
+        review_id (int): The ID of the review.
+
+    Returns:
+        Review: The review.
+    """
+    review = data_manager.get_review(review_id)
+    if review is None or str(review.movie_id) != str(movie_id):
+        abort(404)
+    if str(review.user_id) != str(user_id):
+        abort(403)
+    return review
+
 # Update Review route
 @app.route('/users/<string:user_id>/movies/<string:movie_id>/update_review/<int:review_id>', methods=['GET', 'POST'])
 def update_review(user_id, movie_id, review_id):
@@ -247,7 +313,7 @@ def update_review(user_id, movie_id, review_id):
         render_template or redirect: If the request method is GET, render the update_review.html template.
                                     If the request method is POST, update the review and redirect to the user's movies page.
     """
-    review = data_manager.get_review(review_id)
+    review = get_own_review(user_id, movie_id, review_id)
 
     if request.method == 'POST':
         review_text = request.form['review_text']
@@ -281,6 +347,7 @@ def delete_review(user_id, movie_id, review_id):
     Returns:
         redirect: Redirect to the user's movies page.
     """
+    get_own_review(user_id, movie_id, review_id)
     try:
         data_manager.delete_review(review_id)
         flash("Review deleted successfully", "success")
@@ -312,20 +379,18 @@ def movie_reviews(user_id, movie_id):
 
 @app.route('/users/<user_id>/add_favorite_movie', methods=['POST'])
 def add_favorite_movie(user_id):
+    """
+    Save which of the user's movies are marked as favorites.
+
+    Args:
+        user_id (str): The ID of the user.
+
+    Returns:
+        redirect: Redirect to the user's movies page.
+    """
     try:
-        user = data_manager.get_user(user_id)
-        if user:
-            favorite_movie_ids = request.form.getlist('favorite_movies')
-
-            for movie_id in favorite_movie_ids:
-                try:
-                    movie = data_manager.get_movie(movie_id)
-                    if movie and movie not in user.favorite_movies:
-                        user.favorite_movies.append(movie)
-                except NoResultFound:
-                    flash(f"Movie with ID {movie_id} not found", "error")
-
-            data_manager.session.commit()
+        favorite_movie_ids = request.form.getlist(f'favorite_movies_{user_id}')
+        if data_manager.set_favorite_movies(user_id, favorite_movie_ids) is not None:
             flash("Favorite movies updated successfully", "success")
         else:
             flash("User not found", "error")
@@ -335,23 +400,363 @@ def add_favorite_movie(user_id):
 
     return redirect(url_for('user_movies', user_id=user_id))
 
+# Recommendations route
+@app.route('/users/<int:user_id>/recommendations', methods=['GET'])
+def user_recommendations(user_id):
+    """
+    Render the movies favorited by users who share the user's favorites.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        render_template: The rendered recommendations.html template.
+    """
+    try:
+        user_name = data_manager.get_user_name(user_id)
+        recommendations = data_manager.get_recommendations(user_id)
+        return render_template('recommendations.html', user_id=user_id, user_name=user_name,
+                               recommendations=recommendations)
+    except Exception as e:
+        return render_template('error.html', error=str(e))
+
+@app.route('/api/users/<int:user_id>/recommendations', methods=['GET'])
+def api_user_recommendations(user_id):
+    """Return the user's movie recommendations as JSON."""
+    limit = request.args.get('limit', 10, type=int)
+    try:
+        return jsonify(data_manager.get_recommendations(user_id, limit=limit)), 200
+    except Exception as e:
+        return jsonify({'error': f"Error computing recommendations: {str(e)}"}), 500
+
 @app.route('/api/movie_details/<string:movie_name>', methods=['GET'])
 def api_movie_details(movie_name):
     """Fetch movie details from OMDB API for a given movie name and return as JSON."""
     try:
-        movie_details = data_manager.get_movie_details_by_name(movie_name)
+        movie_details = data_manager.get_movie_details_by_name(movie_name, priority=BACKGROUND)
         
-        if not movie_details:
+        if not movie_details or movie_details.get('Response') == 'False':
             return jsonify({'error': 'Movie not found in OMDB API'}), 404
         
         return jsonify(movie_details), 200
         
+    except QuotaExceeded as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({'error': f"Error fetching movie details: {str(e)}"}), 500
 
+@app.route('/api/movie_details', methods=['GET', 'POST'])
+def api_movie_details_batch():
+    """
+    Return the details of several movies in one response.
+
+    The movie IDs are passed as ?ids=1,2,3 or as a JSON body {"ids": [1, 2, 3]}.
+
+    Returns:
+        JSON: The details of each movie keyed by its ID, with an 'error' entry for
+              movies whose details are unavailable, or 400 for an invalid request.
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True)
+        ids = payload.get('ids') if isinstance(payload, dict) else None
+        # A string would be split into its characters, so "12" must not pass as [1, 2]
+        if not isinstance(ids, list):
+            return jsonify({'error': 'ids must be a list of movie IDs'}), 400
+    else:
+        ids = [part for part in request.args.get('ids', '').split(',') if part]
+    try:
+        movie_ids = list(dict.fromkeys(int(movie_id) for movie_id in ids or []))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids must be a list of movie IDs'}), 400
+    if not movie_ids:
+        return jsonify({'error': 'No movie IDs given'}), 400
+    if len(movie_ids) > DETAILS_BATCH_LIMIT:
+        return jsonify({'error': f'At most {DETAILS_BATCH_LIMIT} movies can be requested at once'}), 400
+
+    details = data_manager.get_movie_details_batch(movie_ids, priority=BACKGROUND)
+    return jsonify({str(movie_id): value for movie_id, value in details.items()}), 200
+
+@app.route('/api/omdb/stats', methods=['GET'])
+def api_omdb_stats():
+    """Return the OMDb quota manager counters and remaining budgets as JSON."""
+    return jsonify(data_manager.omdb.stats()), 200
+
+# Poster thumbnail route
+@app.route('/posters/<int:catalog_id>', methods=['GET'])
+def poster(catalog_id):
+    """
+    Serve the cached poster thumbnail of a catalog entry.
+
+    The file is sent with the server's zero-copy file wrapper (sendfile under
+    Gunicorn) and an ETag. Links that carry the thumbnail digest as ?v= are
+    cached as immutable for a year, since a digest always names the same image.
+
+    Args:
+        catalog_id (int): The ID of the catalog entry.
+
+    Returns:
+        Response: The JPEG thumbnail, 404 if the movie has no poster or 502 if it could not be downloaded.
+    """
+    try:
+        cached = data_manager.get_poster(catalog_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 502
+    if cached is None:
+        abort(404)
+
+    path, digest = cached
+    immutable = request.args.get('v') == digest
+    response = send_file(os.path.abspath(path), mimetype='image/jpeg', etag=digest, conditional=True,
+                         max_age=POSTER_MAX_AGE if immutable else 24 * 3600)
+    response.cache_control.public = True
+    response.cache_control.immutable = immutable
+    return response
+
+# Leaderboard route
+@app.route('/leaderboard', methods=['GET'])
+def leaderboard():
+    """
+    Render the global leaderboards and genre statistics.
+
+    Returns:
+        render_template: The rendered leaderboard.html template.
+    """
+    try:
+        boards = data_manager.get_leaderboard()
+        genres = data_manager.get_genre_stats()
+        return render_template('leaderboard.html', boards=boards, genres=genres)
+    except Exception as e:
+        return render_template('error.html', error=str(e))
+
+@app.route('/api/leaderboard', methods=['GET'])
+def api_leaderboard():
+    """Return the top-rated, most favorited and most added movies as JSON."""
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify(data_manager.get_leaderboard(limit=limit)), 200
+
+@app.route('/api/genres', methods=['GET'])
+def api_genres():
+    """Return the per-genre movie counts and average ratings as JSON."""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify(data_manager.get_genre_stats(limit=limit)), 200
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the leaderboard and genre rollup tables from scratch."""
+    count = data_manager.rebuild_stats()
+    click.echo(f"Rebuilt statistics for {count} movie titles")
+
+@app.cli.command('migrate-catalog')
+@click.option('--resolve', is_flag=True, help="Look up missing imdbIDs in OMDb and merge entries that share one.")
+def migrate_catalog_command(resolve):
+    """Move per-user movie titles into the shared catalog."""
+    summary = migrations.migrate_shared_catalog(engine)
+    if summary is None:
+        click.echo("The movie catalog is already migrated")
+    else:
+        click.echo(f"Created {summary['catalog']} catalog entries, merged {summary['merged']} duplicate movies")
+
+    if resolve:
+        resolved = migrations.resolve_catalog_ids(data_manager.session, data_manager.omdb, BACKGROUND)
+        data_manager.session.commit()
+        click.echo(f"Resolved {resolved['resolved']} imdbIDs, merged {resolved['merged']} catalog entries, "
+                   f"{resolved['not_found']} titles not found")
+        if resolved['remaining']:
+            click.echo(f"OMDb budget exhausted, {resolved['remaining']} entries left for the next run")
+
+    if summary is not None or resolve:
+        data_manager.rebuild_stats()
+        data_manager.recommendations.built = False
+
+def export_response(dataset, user_id):
+    """
+    Build a streaming download response for a user's rows of an export dataset.
+
+    Whole tables are only exported by the CLI, since they contain every user's email address.
+
+    Args:
+        dataset (str): The dataset to export ('users', 'movies', 'favorites', 'reviews' or 'catalog').
+        user_id (int): The user whose rows are exported.
+
+    Returns:
+        Response: A streamed CSV or NDJSON response, gzipped when ?gzip=1 is given.
+    """
+    export_format = request.args.get('format', 'csv')
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+    if dataset not in EXPORT_DATASETS or export_format not in EXPORT_FORMATS:
+        abort(404)
+
+    columns, rows = data_manager.iter_export_rows(dataset, user_id=user_id)
+    chunks = encode_export(columns, rows, export_format, compress=compress)
+
+    filename = f"{dataset}.{export_format}"
+    if user_id is not None:
+        filename = f"user_{user_id}_{filename}"
+    mimetype = EXPORT_FORMATS[export_format]
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/users/<int:user_id>/export/<string:dataset>', methods=['GET'])
+def export_user_data(user_id, dataset):
+    """Stream a user's movies, favorites, reviews or user record as CSV or NDJSON."""
+    return export_response(dataset, user_id=user_id)
+
+@app.cli.command('export')
+@click.argument('dataset', type=click.Choice(list(EXPORT_DATASETS)))
+@click.option('--user-id', type=int, default=None, help='Only export rows belonging to this user.')
+@click.option('--format', 'export_format', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+@click.option('--gzip', 'compress', is_flag=True, help='Compress the output with gzip.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None, help='Output file (defaults to stdout).')
+def export_command(dataset, user_id, export_format, compress, output):
+    """Stream DATASET to a file or stdout in constant memory."""
+    columns, rows = data_manager.iter_export_rows(dataset, user_id=user_id)
+    chunks = encode_export(columns, rows, export_format, compress=compress)
+
+    if output:
+        stream = open(output, 'wb') if compress else open(output, 'w', newline='')
+    else:
+        stream = sys.stdout.buffer if compress else sys.stdout
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+    finally:
+        if output:
+            stream.close()
+
+@app.cli.command('profile-token')
+def profile_token_command():
+    """Print a signed header value that makes the app profile a request."""
+    if profiler is None or not profiler.secret:
+        raise click.ClickException("Set MOVIEWEB_PROFILE_SECRET to enable profiling by header")
+    click.echo(f"{PROFILE_HEADER}: {profiler.make_token()}")
+
+@app.cli.command('fetch-posters')
+def fetch_posters_command():
+    """Download and cache the poster thumbnails of all catalog entries."""
+    summary = data_manager.fetch_posters()
+    click.echo(f"{summary['cached']} posters cached, {summary['failed']} failed")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint and compress the static files and precompile the templates."""
+    manifest = static_assets.build()
+    for filename, entry in sorted(manifest.items()):
+        click.echo(f"{filename} -> {entry['path']} ({', '.join(entry['encodings']) or 'uncompressed'})")
+    click.echo(f"Compiled {precompile_templates(app)} templates")
+
+@app.cli.command('backup')
+@click.option('--dest', default=BACKUP_DIR, show_default=True, help='Directory the snapshots are stored in.')
+@click.option('--keep', type=int, default=BACKUP_KEEP, show_default=True, help='Snapshots to keep, 0 keeps all.')
+@click.option('--pages', type=int, default=BACKUP_PAGES, show_default=True, help='Pages copied per step.')
+@click.option('--pause', type=float, default=BACKUP_PAUSE, show_default=True, help='Seconds to sleep between steps.')
+@click.option('--no-gzip', is_flag=True, help='Store the snapshot uncompressed.')
+def backup_command(dest, keep, pages, pause, no_gzip):
+    """Take a consistent snapshot of the live database."""
+    result = backup_database(engine.url.database, dest, pages=pages, pause=pause,
+                             compress=not no_gzip, keep=keep)
+    click.echo(f"Wrote {result['path']} ({result['pages']} pages, {result['bytes']} bytes) "
+               f"in {result['seconds']}s, removed {len(result['removed'])} old snapshots")
+
+@app.cli.command('restore')
+@click.argument('snapshot', required=False)
+@click.option('--dest', default=BACKUP_DIR, show_default=True, help='Directory to take the latest snapshot from.')
+@click.option('--verify-only', is_flag=True, help='Only check the snapshot, do not restore it.')
+def restore_command(snapshot, dest, verify_only):
+    """Verify a snapshot (the latest one by default) and restore it into the database."""
+    if snapshot is None:
+        snapshots = list_snapshots(dest)
+        if not snapshots:
+            raise click.ClickException(f"No snapshots found in {dest}")
+        snapshot = snapshots[0]
+
+    try:
+        if verify_only:
+            counts = verify_snapshot(snapshot)
+        else:
+            counts = restore_database(snapshot, engine.url.database)
+            data_manager.recommendations.built = False
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"{'Verified' if verify_only else 'Restored'} {snapshot}")
+    for table, count in counts.items():
+        click.echo(f"  {table}: {count} rows")
+
+@app.cli.command('fork-smoke')
+@click.option('--workers', type=int, default=os.cpu_count() or 2, help='Number of worker processes to fork.')
+@click.option('--requests', 'count', type=int, default=200, help='Requests sent by each worker.')
+def fork_smoke_command(workers, count):
+    """Fork workers from the loaded app, like a preloading server, and put them under load."""
+    # Use the engine and session in the parent first, as a preloaded master would
+    data_manager.get_users()
+    data_manager.close_session()
+
+    paths = ['/users', '/api/leaderboard', '/api/genres', '/users/1/export/movies']
+    started = time.time()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                client = app.test_client()
+                # One write per worker exercises the database lock across processes
+                data_manager.rebuild_stats()
+                for i in range(count):
+                    response = client.get(paths[i % len(paths)])
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{paths[i % len(paths)]} returned {response.status_code}")
+                status = 0
+            except Exception as e:
+                print(f"Worker {os.getpid()} failed:", e)
+            finally:
+                os._exit(status)
+        pids.append(pid)
+
+    failed = 0
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            failed += 1
+    elapsed = time.time() - started
+
+    total = workers * count
+    click.echo(f"{workers} workers served {total} requests in {elapsed:.2f}s "
+               f"({total / elapsed:.0f} req/s), {failed} workers failed")
+    if failed:
+        sys.exit(1)
+
 
 # Create the tables in the database
 Base.metadata.create_all(engine)
+migrations.migrate_shared_catalog(engine)
+migrations.add_missing_columns(engine)
+data_manager.ensure_stats()
+
+# Opt-in group commit for high write volumes, e.g. MOVIEWEB_GROUP_COMMIT=1
+if os.environ.get('MOVIEWEB_GROUP_COMMIT', '').lower() in ('1', 'true', 'yes'):
+    data_manager.enable_group_commit(
+        interval=float(os.environ.get('MOVIEWEB_GROUP_COMMIT_INTERVAL', 0.005)),
+        max_batch=int(os.environ.get('MOVIEWEB_GROUP_COMMIT_MAX_BATCH', 100)),
+    )
+
+# Opt-in scheduled snapshots, e.g. MOVIEWEB_BACKUP_INTERVAL=3600 for hourly backups
+if os.environ.get('MOVIEWEB_BACKUP_INTERVAL'):
+    backup_scheduler = BackupScheduler(
+        engine.url.database,
+        interval=float(os.environ['MOVIEWEB_BACKUP_INTERVAL']),
+        dest_dir=os.environ.get('MOVIEWEB_BACKUP_DIR', BACKUP_DIR),
+        keep=int(os.environ.get('MOVIEWEB_BACKUP_KEEP', BACKUP_KEEP)),
+    )
+    # Started by the first request of each process rather than here, so a preloading
+    # server starts it in every worker and not in the master that forks them
+    app.before_request(backup_scheduler.start)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
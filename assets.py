@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import abort, request, send_file, url_for
+from jinja2 import FileSystemBytecodeCache
+
+from fileutils import write_atomic
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; without it only gzip variants are built
+    brotli = None
+
+TEMPLATE_CACHE_DIR = '.jinja_cache'
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Only text assets are worth compressing; images and fonts already are
+COMPRESSIBLE = ('.css', '.js', '.svg', '.html', '.json', '.txt', '.map')
+
+
+def enable_bytecode_cache(app, directory=TEMPLATE_CACHE_DIR):
+    """
+    Store compiled templates on disk so every worker process can load them without compiling.
+
+    Args:
+        app (Flask): The app.
+        directory (str): The directory the bytecode is stored in.
+    """
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def precompile_templates(app):
+    """
+    Compile every template of the app into its Jinja environment and bytecode cache.
+
+    Called before a preloading server forks, the compiled templates are shared by
+    all workers and the first request of a worker no longer pays for compiling.
+
+    Args:
+        app (Flask): The app.
+
+    Returns:
+        int: The number of compiled templates.
+    """
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+class StaticAssets:
+    """
+    Fingerprinted, pre-compressed copies of the static files.
+
+    build() copies every file of the static folder to static/build under a name
+    containing a hash of its content ('styles.css' becomes 'styles.<hash>.css'),
+    next to gzip and, when the brotli package is installed, brotli variants, and
+    records them in manifest.json. Templates link to assets with
+    asset_url('styles.css'); the fingerprinted files are served from /assets/
+    as immutable for a year, in the best encoding the browser accepts. Files
+    missing from the manifest fall back to the plain /static/ URL.
+
+    Attributes:
+        build_dir (str): The directory of the fingerprinted files.
+        manifest (dict): The build entry of each static file name.
+    """
+
+    def __init__(self, app=None):
+        self.static_dir = None
+        self.build_dir = None
+        self.manifest = {}
+        self._files = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the /assets/ route and the asset_url() template function on an app."""
+        self.static_dir = app.static_folder
+        self.build_dir = os.path.join(app.static_folder, 'build')
+        self.load()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.url, 'asset_url')
+
+    def load(self):
+        """Read the manifest of the last build, if there is one."""
+        try:
+            with open(os.path.join(self.build_dir, 'manifest.json')) as file:
+                self.manifest = json.load(file)
+        except FileNotFoundError:
+            self.manifest = {}
+        self._files = {entry['path']: entry for entry in self.manifest.values()}
+
+    def build(self):
+        """
+        Fingerprint and compress all static files and write the manifest.
+
+        Unchanged files keep their name and are not rewritten, so running the build
+        on every start is cheap, and files of earlier builds are kept for pages
+        that still link to them.
+
+        Returns:
+            dict: The new manifest.
+        """
+        manifest = {}
+        for root, dirs, files in os.walk(self.static_dir):
+            dirs[:] = [name for name in dirs if os.path.join(root, name) != self.build_dir and name != '__pycache__']
+            for name in files:
+                if name.endswith('.py'):
+                    continue
+                source = os.path.join(root, name)
+                filename = os.path.relpath(source, self.static_dir).replace(os.sep, '/')
+                with open(source, 'rb') as file:
+                    data = file.read()
+                stem, extension = os.path.splitext(filename)
+                path = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+                manifest[filename] = {'path': path, 'encodings': self._write_variants(path, data)}
+
+        write_atomic(os.path.join(self.build_dir, 'manifest.json'),
+                      json.dumps(manifest, indent=2, sort_keys=True).encode())
+        self.load()
+        return manifest
+
+    def _write_variants(self, path, data):
+        target = os.path.join(self.build_dir, path)
+        if not os.path.exists(target):
+            write_atomic(target, data)
+
+        encodings = []
+        if not path.endswith(COMPRESSIBLE):
+            return encodings
+        variants = [('gzip', '.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.insert(0, ('br', '.br', lambda: brotli.compress(data, quality=11)))
+        for encoding, suffix, compress in variants:
+            if not os.path.exists(target + suffix):
+                packed = compress()
+                if len(packed) >= len(data):
+                    continue
+                write_atomic(target + suffix, packed)
+            encodings.append(encoding)
+        return encodings
+
+    def url(self, filename):
+        """
+        Return the URL of a static file, fingerprinted when it has been built.
+
+        Args:
+            filename (str): The file name relative to the static folder.
+
+        Returns:
+            str: The /assets/ URL of the fingerprinted file, or its /static/ URL.
+        """
+        entry = self.manifest.get(filename)
+        if entry is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=entry['path'])
+
+    def serve(self, filename):
+        """Serve a fingerprinted file in the best encoding the client accepts."""
+        entry = self._files.get(filename)
+        if entry is None:
+            abort(404)
+
+        encoding = request.accept_encodings.best_match(entry['encodings'])
+        path = os.path.join(self.build_dir, filename)
+        if encoding:
+            path += '.br' if encoding == 'br' else '.gz'
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        response = send_file(os.path.abspath(path), mimetype=mimetype, conditional=True, max_age=ASSET_MAX_AGE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -7,8 +8,34 @@ Base = declarative_base()
 # The URI for the SQLite database
 DATABASE_URI = 'sqlite:///movieweb.db'
 
+def configure_sqlite(engine):
+    """
+    Tune every new SQLite connection of an engine for use by several processes.
+
+    WAL mode lets readers run while another process writes, and the busy timeout
+    makes a writer wait for the database lock instead of failing immediately.
+    The synchronous setting stays at its default (FULL), so a committed
+    transaction survives a power loss.
+
+    Args:
+        engine: The SQLAlchemy engine.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.close()
+
 # Create a SQLAlchemy engine for connecting to the database
 engine = create_engine(DATABASE_URI)
+configure_sqlite(engine)
+
+# Forked worker processes must not reuse the connections of the parent process
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
 
 # Create a base class for declarative SQLAlchemy models
 Base = declarative_base()
@@ -21,7 +48,8 @@ This module provides database-related utilities using SQLAlchemy.
 
 Attributes:
     DATABASE_URI (str): The URI for the SQLite database.
-    engine: A SQLAlchemy engine for connecting to the database.
+    engine: A SQLAlchemy engine for connecting to the database. Its connection pool
+        is replaced in forked child processes.
     Base: A base class for declarative SQLAlchemy models.
     Session: A session factory for creating database sessions.
 """
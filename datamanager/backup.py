@@ -0,0 +1,300 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, one process should run backups
+    fcntl = None
+
+BACKUP_DIR = 'backups'
+BACKUP_KEEP = 7
+
+# Pages copied per backup step, and the pause between steps that lets writers in
+BACKUP_PAGES = 256
+BACKUP_PAUSE = 0.005
+
+SNAPSHOT_PREFIX = 'movieweb-'
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_database(db_path, dest_dir=BACKUP_DIR, pages=BACKUP_PAGES, pause=BACKUP_PAUSE,
+                    compress=True, keep=BACKUP_KEEP, max_restarts=3):
+    """
+    Take a consistent snapshot of a live SQLite database with the online backup API.
+
+    The database is copied `pages` pages at a time, sleeping `pause` seconds after
+    each step so that requests writing to the database are only ever blocked for
+    one step. If another connection writes in between, SQLite restarts the copy,
+    so the snapshot always matches a single committed state; after `max_restarts`
+    restarts the rest is copied in one step. The snapshot is
+    written next to its final name and renamed when complete, then optionally
+    gzipped, and only the newest `keep` snapshots are kept.
+
+    Args:
+        db_path (str): The path of the database file.
+        dest_dir (str): The directory the snapshots are stored in.
+        pages (int): The number of pages copied per step.
+        pause (float): The number of seconds to sleep between steps.
+        compress (bool): Whether to gzip the snapshot.
+        keep (int): The number of snapshots to keep, or 0 to keep all of them.
+        max_restarts (int): The number of restarts after which the copy is finished in one step.
+
+    Returns:
+        dict: The 'path', 'pages', 'bytes', 'seconds' and 'restarts' of the snapshot and the
+              'removed' old snapshots.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    started = time.monotonic()
+    name = f"{SNAPSHOT_PREFIX}{datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')}.db"
+    path = os.path.join(dest_dir, name)
+    partial = path + '.part'
+
+    progress = {'pages': 0, 'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        if progress['remaining'] is not None and remaining > progress['remaining']:
+            progress['restarts'] += 1
+            if progress['restarts'] > max_restarts:
+                raise _TooManyRestarts()
+        progress.update(pages=total, remaining=remaining)
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(partial)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=step)
+        except _TooManyRestarts:
+            # Writes keep invalidating the stepped copy; copy in one step instead,
+            # which in WAL mode reads a snapshot without blocking the writers
+            source.backup(target, pages=-1)
+        # The snapshot is a standalone file, so it does not need the WAL
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+        source.close()
+
+    if compress:
+        with open(partial, 'rb') as raw, gzip.open(path + '.gz.part', 'wb', compresslevel=6) as packed:
+            shutil.copyfileobj(raw, packed, 1024 * 1024)
+        os.remove(partial)
+        partial, path = path + '.gz.part', path + '.gz'
+    os.replace(partial, path)
+
+    return {
+        'path': path,
+        'pages': progress['pages'],
+        'bytes': os.path.getsize(path),
+        'seconds': round(time.monotonic() - started, 3),
+        'restarts': progress['restarts'],
+        'removed': rotate_snapshots(dest_dir, keep),
+    }
+
+
+def list_snapshots(dest_dir=BACKUP_DIR):
+    """
+    List the finished snapshots in a backup directory.
+
+    Args:
+        dest_dir (str): The backup directory.
+
+    Returns:
+        list: The snapshot paths, newest first.
+    """
+    if not os.path.isdir(dest_dir):
+        return []
+    names = [name for name in os.listdir(dest_dir)
+             if name.startswith(SNAPSHOT_PREFIX) and name.endswith(('.db', '.db.gz'))]
+    # The names contain the UTC timestamp, so they sort chronologically
+    return [os.path.join(dest_dir, name) for name in sorted(names, reverse=True)]
+
+
+def rotate_snapshots(dest_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """
+    Delete all but the newest `keep` snapshots.
+
+    Args:
+        dest_dir (str): The backup directory.
+        keep (int): The number of snapshots to keep, or 0 to keep all of them.
+
+    Returns:
+        list: The paths of the deleted snapshots.
+    """
+    if keep <= 0:
+        return []
+    removed = list_snapshots(dest_dir)[keep:]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def verify_snapshot(snapshot):
+    """
+    Check that a snapshot is an intact database and count the rows of its tables.
+
+    Args:
+        snapshot (str): The path of a .db or .db.gz snapshot.
+
+    Returns:
+        dict: The row count of every table in the snapshot.
+
+    Raises:
+        ValueError: If the snapshot fails SQLite's integrity check.
+    """
+    with _unpacked(snapshot) as path:
+        connection = sqlite3.connect(path)
+        try:
+            return _check(connection, snapshot)
+        finally:
+            connection.close()
+
+
+def restore_database(snapshot, db_path, pages=BACKUP_PAGES):
+    """
+    Verify a snapshot and copy it over a database, then verify the result.
+
+    The copy goes through the backup API into the live database, so it takes the
+    database's write lock like any other writer and connections of running workers
+    see the restored data on their next transaction.
+
+    Args:
+        snapshot (str): The path of a .db or .db.gz snapshot.
+        db_path (str): The path of the database to restore into.
+        pages (int): The number of pages copied per step.
+
+    Returns:
+        dict: The row count of every restored table.
+
+    Raises:
+        ValueError: If the snapshot is damaged or the restored database does not match it.
+    """
+    with _unpacked(snapshot) as path:
+        source = sqlite3.connect(path)
+        try:
+            expected = _check(source, snapshot)
+            target = sqlite3.connect(db_path, timeout=30)
+            try:
+                source.backup(target, pages=pages)
+                restored = _check(target, db_path)
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+    if restored != expected:
+        raise ValueError(f"Restored database does not match {snapshot}: {restored} != {expected}")
+    return restored
+
+
+def _check(connection, label):
+    """Run the integrity check on a connection and return the row counts of its tables."""
+    try:
+        result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"{label} is not a valid database: {e}")
+    if result != 'ok':
+        raise ValueError(f"{label} failed the integrity check: {result}")
+    tables = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    return {table: connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+class _unpacked:
+    """Context manager yielding a plain database path for a possibly gzipped snapshot."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.temporary = None
+
+    def __enter__(self):
+        if not os.path.exists(self.snapshot):
+            raise ValueError(f"Snapshot not found: {self.snapshot}")
+        if not self.snapshot.endswith('.gz'):
+            return self.snapshot
+        handle, self.temporary = tempfile.mkstemp(suffix='.db')
+        with os.fdopen(handle, 'wb') as raw, gzip.open(self.snapshot, 'rb') as packed:
+            shutil.copyfileobj(packed, raw, 1024 * 1024)
+        return self.temporary
+
+    def __exit__(self, *exc_info):
+        if self.temporary:
+            os.remove(self.temporary)
+
+
+class BackupScheduler:
+    """
+    Takes a snapshot of the database every `interval` seconds in a background thread.
+
+    Only one process at a time takes a scheduled snapshot: the others skip the run
+    while a lock file in the backup directory is held, or when another process
+    took a snapshot during the current interval, so every worker of a
+    multi-process server can start a scheduler.
+
+    Attributes:
+        interval (float): The number of seconds between snapshots.
+        last_result (dict): The result of the last snapshot, or None.
+        last_error (str): The error of the last failed snapshot, or None.
+    """
+
+    def __init__(self, db_path, interval, dest_dir=BACKUP_DIR, **options):
+        self.db_path = db_path
+        self.interval = interval
+        self.dest_dir = dest_dir
+        self.options = options
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Start the background thread of the current process, unless it is running."""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name='backup', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Ask the background thread to stop after its current snapshot."""
+        self._stop.set()
+
+    def run_once(self):
+        """
+        Take one snapshot unless another process is taking one.
+
+        Returns:
+            dict: The result of backup_database(), or None if the run was skipped.
+        """
+        os.makedirs(self.dest_dir, exist_ok=True)
+        with open(os.path.join(self.dest_dir, '.lock'), 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None
+            snapshots = list_snapshots(self.dest_dir)
+            if snapshots and time.time() - os.path.getmtime(snapshots[0]) < self.interval / 2:
+                return None
+            self.last_result = backup_database(self.db_path, self.dest_dir, **self.options)
+            return self.last_result
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print("Scheduled backup failed:", e)
@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+import zlib
+
+# Number of rows buffered before a chunk is handed to the response.
+CHUNK_ROWS = 500
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def csv_chunks(columns, rows, chunk_rows=CHUNK_ROWS):
+    """
+    Encode rows as CSV, yielding the header first and then one chunk per batch of rows.
+
+    Args:
+        columns (list): The column names written as the header line.
+        rows (iterable): An iterable of row tuples in column order.
+        chunk_rows (int): The number of rows encoded into each yielded chunk.
+
+    Yields:
+        str: CSV text chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+
+    if count:
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, rows, chunk_rows=CHUNK_ROWS):
+    """
+    Encode rows as newline-delimited JSON objects keyed by column name.
+
+    Args:
+        columns (list): The column names used as object keys.
+        rows (iterable): An iterable of row tuples in column order.
+        chunk_rows (int): The number of rows encoded into each yielded chunk.
+
+    Yields:
+        str: NDJSON text chunks.
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row))))
+        if len(lines) >= chunk_rows:
+            lines.append('')
+            yield '\n'.join(lines)
+            lines = []
+
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines)
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Compress a stream of text chunks into a gzip stream on the fly.
+
+    Args:
+        chunks (iterable): An iterable of str chunks.
+        level (int): The zlib compression level.
+
+    Yields:
+        bytes: Pieces of a single gzip member.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode_export(columns, rows, export_format, compress=False):
+    """
+    Build the chunk generator for an export in the requested format.
+
+    Args:
+        columns (list): The column names of the exported dataset.
+        rows (iterable): An iterable of row tuples in column order.
+        export_format (str): Either 'csv' or 'ndjson'.
+        compress (bool): Whether to gzip the stream.
+
+    Returns:
+        generator: A generator of str chunks, or bytes chunks when compressed.
+
+    Raises:
+        ValueError: If the export format is not supported.
+    """
+    if export_format == 'csv':
+        chunks = csv_chunks(columns, rows)
+    elif export_format == 'ndjson':
+        chunks = ndjson_chunks(columns, rows)
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    if compress:
+        return gzip_chunks(chunks)
+    return chunks
@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+
+class GroupCommitter:
+    """
+    Batches write operations from concurrent requests into shared transactions.
+
+    Each operation is a callable that receives a SQLAlchemy session and returns a
+    plain value (not an ORM object, as the session is closed after the batch). A
+    background thread collects operations for up to `interval` seconds or until
+    `max_batch` operations are queued, runs them in one transaction and commits
+    once. Each operation runs in its own savepoint, so one that fails is rolled
+    back alone and its caller gets the exception while the rest of the batch still
+    commits together. Only if the commit itself fails are the operations retried
+    one transaction each.
+
+    Attributes:
+        interval (float): The maximum time in seconds an operation waits for its batch.
+        max_batch (int): The maximum number of operations per transaction.
+        counters (dict): The number of operations, batches, commits and retried batches.
+    """
+
+    def __init__(self, session_factory, interval=0.005, max_batch=100):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.counters = {'operations': 0, 'batches': 0, 'commits': 0, 'retried_batches': 0}
+        self._session_factory = session_factory
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, operation):
+        """
+        Queue a write operation for the next group commit.
+
+        Args:
+            operation (callable): A function taking a session and returning a plain value.
+
+        Returns:
+            Future: Resolved with the operation's result once its transaction committed.
+        """
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def run(self, operation, timeout=30):
+        """
+        Queue a write operation and wait until its transaction is committed.
+
+        An operation still queued after `timeout` seconds is withdrawn and never
+        runs. One whose batch has already started is waited for, so a write that
+        commits is never reported as failed.
+
+        Args:
+            operation (callable): A function taking a session and returning a plain value.
+            timeout (float): The maximum number of seconds to wait for the batch to start.
+
+        Returns:
+            The return value of the operation.
+
+        Raises:
+            TimeoutError: If the operation was withdrawn before it ran.
+            Exception: Whatever the operation or its commit raised.
+        """
+        future = self.submit(operation)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise
+            return future.result()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, args=(self._queue,),
+                                                name='group-commit', daemon=True)
+                self._thread.start()
+
+    def _loop(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """Run a batch in a single transaction, each operation in a savepoint of its own."""
+        # Operations withdrawn by a timed-out caller are dropped; the others can no longer be cancelled
+        batch = [(operation, future) for operation, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        session = self._session_factory()
+        try:
+            self._begin(session)
+            succeeded = []
+            for operation, future in batch:
+                try:
+                    with session.begin_nested():
+                        result = operation(session)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    succeeded.append((operation, future, result))
+            try:
+                session.commit()
+            except Exception:
+                session.rollback()
+                self._retry_individually(session, [(operation, future) for operation, future, result in succeeded])
+            else:
+                for operation, future, result in succeeded:
+                    future.set_result(result)
+                self.counters['commits'] += 1
+        finally:
+            session.close()
+            self.counters['operations'] += len(batch)
+            self.counters['batches'] += 1
+
+    @staticmethod
+    def _begin(session):
+        """Open the batch's transaction, taking SQLite's write lock right away."""
+        connection = session.connection()
+        if connection.dialect.name == 'sqlite':
+            # pysqlite only opens a transaction before an INSERT, UPDATE or DELETE, so
+            # the first savepoint would otherwise start a transaction of its own
+            # and releasing it would commit
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    def _retry_individually(self, session, batch):
+        self.counters['retried_batches'] += 1
+        for operation, future in batch:
+            try:
+                result = operation(session)
+                session.commit()
+                self.counters['commits'] += 1
+                future.set_result(result)
+            except Exception as e:
+                session.rollback()
+                future.set_exception(e)
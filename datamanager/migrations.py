@@ -0,0 +1,198 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import MetaData, inspect, text
+
+from datamanager.omdb import QuotaExceeded
+from models.catalog import CatalogMovie
+from models.movie import Movie
+from models.stats import MovieStats
+
+
+def needs_catalog_migration(engine):
+    """
+    Check whether the database still stores titles on the per-user 'movies' rows.
+
+    Args:
+        engine: The SQLAlchemy engine.
+
+    Returns:
+        bool: True if the 'movies' table has not been split into the shared catalog yet.
+    """
+    inspector = inspect(engine)
+    if 'movies' not in inspector.get_table_names():
+        return False
+    return 'catalog_id' not in {column['name'] for column in inspector.get_columns('movies')}
+
+
+def migrate_shared_catalog(engine):
+    """
+    Move movie titles from the per-user 'movies' rows into the shared catalog.
+
+    Every distinct title (compared case-insensitively) becomes one 'catalog_movies'
+    row, the 'movies' table is rebuilt as a user-library link table pointing at it,
+    and a user's duplicate entries of the same title are merged, moving their
+    reviews and favorites to the kept entry. The 'movie_stats' rollup is recreated
+    keyed by catalog entry and has to be rebuilt afterwards.
+
+    No OMDb lookups are made, so the new catalog entries have no imdbID yet; run
+    resolve_catalog_ids() (flask migrate-catalog --resolve) to fill them in.
+
+    Args:
+        engine: The SQLAlchemy engine. CatalogMovie's table must already exist.
+
+    Returns:
+        dict: The number of 'catalog' entries created and duplicate 'merged' movie rows,
+              or None if the database was already migrated.
+    """
+    if not needs_catalog_migration(engine):
+        return None
+
+    with engine.begin() as connection:
+        movies = connection.execute(text('SELECT id, user_id, title, genre FROM movies ORDER BY id')).fetchall()
+
+        catalog_ids = {}
+        entry_catalog = {}
+        for movie_id, user_id, title, genre in movies:
+            key = (title or '').strip().lower()
+            if key not in catalog_ids:
+                result = connection.execute(CatalogMovie.__table__.insert().values(title=(title or '').strip()))
+                catalog_ids[key] = result.inserted_primary_key[0]
+            entry_catalog[movie_id] = catalog_ids[key]
+
+        # Built in a separate MetaData, with the tables its foreign keys refer to
+        legacy = MetaData()
+        for foreign_key in Movie.__table__.foreign_keys:
+            foreign_key.column.table.to_metadata(legacy)
+        new_movies = Movie.__table__.to_metadata(legacy, name='movies_new')
+        new_movies.create(connection)
+
+        kept = {}
+        merged = 0
+        for movie_id, user_id, title, genre in movies:
+            catalog_id = entry_catalog[movie_id]
+            survivor = kept.get((user_id, catalog_id))
+            if survivor is None:
+                kept[(user_id, catalog_id)] = movie_id
+                connection.execute(new_movies.insert().values(
+                    id=movie_id, user_id=user_id, catalog_id=catalog_id, genre=genre))
+            else:
+                _merge_movie(connection, movie_id, survivor)
+                merged += 1
+
+        connection.execute(text('DROP TABLE movies'))
+        connection.execute(text('ALTER TABLE movies_new RENAME TO movies'))
+
+        # The rollup used to be keyed by title; it is derived data, so recreate it
+        connection.execute(text('DROP TABLE IF EXISTS movie_stats'))
+        MovieStats.__table__.create(connection)
+
+    return {'catalog': len(catalog_ids), 'merged': merged}
+
+
+def add_missing_columns(engine):
+    """
+    Add the catalog columns introduced after the shared catalog to an existing database.
+
+    Args:
+        engine: The SQLAlchemy engine.
+
+    Returns:
+        list: The names of the added columns.
+    """
+    existing = {column['name'] for column in inspect(engine).get_columns('catalog_movies')}
+    added = []
+    with engine.begin() as connection:
+        for column in CatalogMovie.__table__.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(engine.dialect)
+                connection.execute(text(f'ALTER TABLE catalog_movies ADD COLUMN {column.name} {column_type}'))
+                added.append(column.name)
+    return added
+
+
+def resolve_catalog_ids(session, omdb, priority):
+    """
+    Look up the imdbID of catalog entries created without one and merge duplicates.
+
+    Entries whose titles OMDb resolves to the same imdbID ('Se7en' and 'Seven')
+    are merged into one, and so are the users' entries of the merged titles.
+    Stops early when the OMDb budget runs out; running it again continues with
+    the entries that are still unresolved.
+
+    Args:
+        session: The SQLAlchemy session. The caller is responsible for committing.
+        omdb (OmdbClient): The OMDb client.
+        priority (str): The OMDb quota priority of the lookups.
+
+    Returns:
+        dict: The number of 'resolved', 'merged', 'not_found' and 'remaining' catalog entries.
+    """
+    pending = session.query(CatalogMovie).filter(CatalogMovie.imdb_id.is_(None)).all()
+    summary = {'resolved': 0, 'merged': 0, 'not_found': 0, 'remaining': 0}
+    for index, catalog in enumerate(pending):
+        try:
+            details = omdb.get(catalog.title, priority=priority)
+        except QuotaExceeded:
+            summary['remaining'] = len(pending) - index
+            break
+        except ValueError:
+            summary['not_found'] += 1
+            continue
+        if not details or details.get('Response') == 'False' or not details.get('imdbID'):
+            summary['not_found'] += 1
+            continue
+
+        existing = session.query(CatalogMovie).filter_by(imdb_id=details['imdbID']).first()
+        if existing is None:
+            apply_omdb_details(catalog, details)
+            summary['resolved'] += 1
+            continue
+
+        connection = session.connection()
+        entries = connection.execute(text('SELECT id, user_id FROM movies WHERE catalog_id = :catalog_id'),
+                                     {'catalog_id': catalog.id}).fetchall()
+        for movie_id, user_id in entries:
+            survivor = connection.execute(
+                text('SELECT id FROM movies WHERE user_id = :user_id AND catalog_id = :catalog_id'),
+                {'user_id': user_id, 'catalog_id': existing.id}).scalar()
+            if survivor is None:
+                connection.execute(text('UPDATE movies SET catalog_id = :catalog_id WHERE id = :id'),
+                                   {'catalog_id': existing.id, 'id': movie_id})
+            else:
+                _merge_movie(connection, movie_id, survivor)
+                connection.execute(text('DELETE FROM movies WHERE id = :id'), {'id': movie_id})
+        connection.execute(text('DELETE FROM movie_stats WHERE catalog_id = :id'), {'id': catalog.id})
+        session.expire_all()
+        session.delete(session.query(CatalogMovie).get(catalog.id))
+        session.flush()
+        summary['merged'] += 1
+    return summary
+
+
+def apply_omdb_details(catalog, details):
+    """
+    Copy an OMDb response onto a catalog entry.
+
+    Args:
+        catalog (CatalogMovie): The catalog entry.
+        details (dict): The OMDb response.
+    """
+    catalog.imdb_id = details.get('imdbID')
+    catalog.title = details.get('Title', catalog.title)
+    catalog.year = details.get('Year')
+    catalog.genre = details.get('Genre')
+    catalog.details = json.dumps(details)
+    catalog.fetched_at = datetime.utcnow()
+
+
+def _merge_movie(connection, movie_id, survivor_id):
+    """Move the reviews and favorites of a duplicate movie row to the row that is kept."""
+    connection.execute(text('UPDATE reviews SET movie_id = :survivor WHERE movie_id = :movie_id'),
+                       {'survivor': survivor_id, 'movie_id': movie_id})
+    connection.execute(text(
+        'INSERT OR IGNORE INTO user_favorite_movies (user_id, movie_id) '
+        'SELECT user_id, :survivor FROM user_favorite_movies WHERE movie_id = :movie_id'),
+        {'survivor': survivor_id, 'movie_id': movie_id})
+    connection.execute(text('DELETE FROM user_favorite_movies WHERE movie_id = :movie_id'),
+                       {'movie_id': movie_id})
@@ -0,0 +1,276 @@
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from sqlalchemy import bindparam, delete, select, text
+
+from models.quota import ApiQuota
+
+OMDB_URL = 'http://www.omdbapi.com/'
+
+# The free OMDb tier allows 1000 requests per day, counted per UTC day
+OMDB_DAILY_LIMIT = 1000
+DAY = 24 * 3600
+OMDB_PER_SECOND = 5
+
+# Request priorities: interactive requests (adding a movie) always win over
+# background requests (detail lookups and cache refreshes)
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+
+class QuotaExceeded(Exception):
+    """Raised when the OMDb budget is exhausted and no cached data is available."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SharedQuota:
+    """
+    Fixed-window request counters kept in the database and shared by all processes.
+
+    A limit is a (scope, period, limit) tuple. Its window is the current time divided
+    by `period` seconds, so a 86400 second window resets at midnight UTC like the
+    OMDb daily quota, and a 1 second window limits the request rate. Windows are
+    counted with conditional upserts, so concurrent processes can never go over a
+    limit, and the counts survive restarts and worker recycling.
+
+    Attributes:
+        name (str): The prefix of the counter names, e.g. 'omdb'.
+    """
+
+    def __init__(self, engine, name='omdb', clock=time.time):
+        self.engine = engine
+        self.name = name
+        self._clock = clock
+
+    def try_acquire(self, limits):
+        """
+        Count one request against all limits if none of them is used up.
+
+        Args:
+            limits (list): (scope, period, limit) tuples, e.g. ('day', 86400, 1000).
+
+        Returns:
+            tuple: (True, None) if the request was counted, otherwise (False, scope)
+                   with the scope of the first limit that is used up.
+        """
+        now = self._clock()
+        with self.engine.connect() as connection:
+            transaction = connection.begin()
+            try:
+                for scope, period, limit in limits:
+                    name = f"{self.name}:{scope}"
+                    window = int(now // period)
+                    if limit < 1 or connection.execute(
+                            _COUNT, {'name': name, 'window': window, 'limit': limit}).rowcount == 0:
+                        transaction.rollback()
+                        return False, scope
+                    connection.execute(_PRUNE, {'name': name, 'window': window})
+                transaction.commit()
+            except Exception:
+                transaction.rollback()
+                raise
+        return True, None
+
+    def used(self, scope, period):
+        """Return the number of requests counted in the current window of a scope."""
+        window = int(self._clock() // period)
+        with self.engine.connect() as connection:
+            used = connection.execute(
+                select(ApiQuota.used).where(ApiQuota.name == f"{self.name}:{scope}", ApiQuota.window == window)
+            ).scalar()
+        return used or 0
+
+    def reset_in(self, period):
+        """Return the number of seconds until the current window of a period ends."""
+        return period - self._clock() % period
+
+
+# Plain SQL text, because SQLAlchemy 1.4 cannot cache a compiled on_conflict_do_update()
+# and would compile it again on every acquire. The update is skipped, and no row
+# counted, once the window is used up.
+_COUNT = text(
+    f'INSERT INTO {ApiQuota.__tablename__} (name, "window", used) VALUES (:name, :window, 1) '
+    f'ON CONFLICT (name, "window") DO UPDATE SET used = used + 1 WHERE used < :limit'
+)
+_PRUNE = delete(ApiQuota).where(ApiQuota.name == bindparam('name'), ApiQuota.window < bindparam('window'))
+
+
+class OmdbClient:
+    """
+    Quota-aware OMDb client with a stale-while-revalidate cache.
+
+    Every upstream call is counted against the daily limit and the per-second
+    limit of a SharedQuota, so all worker processes share one budget that
+    restarts do not reset. Background requests may not dip into the share of the
+    daily budget reserved for interactive requests, and never wait for the next
+    second.
+    Cached responses are served directly while fresh; once stale they are still
+    served immediately while a background refresh runs, and when the budget is
+    exhausted any cached response is served rather than failing.
+
+    Attributes:
+        quota (SharedQuota): The request counters shared by all processes.
+        daily_limit (int): The number of upstream calls allowed per UTC day.
+        per_second (int): The number of upstream calls allowed per second.
+        interactive_reserve (int): The daily calls only interactive requests may use.
+        counters (dict): Request, cache and throttling counters.
+    """
+
+    def __init__(self, api_key, quota, daily_limit=OMDB_DAILY_LIMIT, per_second=OMDB_PER_SECOND,
+                 interactive_share=0.3, fresh_ttl=24 * 3600, max_entries=10000,
+                 max_wait=1.0, fetch=requests.get):
+        self.api_key = api_key
+        self.quota = quota
+        self.daily_limit = daily_limit
+        self.per_second = per_second
+        self.interactive_reserve = int(daily_limit * interactive_share)
+        self.fresh_ttl = fresh_ttl
+        self.max_entries = max_entries
+        self.max_wait = max_wait
+        self._fetch = fetch
+        self._cache = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.counters = {
+            'requests_interactive': 0,
+            'requests_background': 0,
+            'cache_hits': 0,
+            'stale_hits': 0,
+            'upstream_calls': 0,
+            'upstream_errors': 0,
+            'throttled_interactive': 0,
+            'throttled_background': 0,
+            'revalidations': 0,
+        }
+
+    def get(self, title, priority=INTERACTIVE):
+        """
+        Fetch the OMDb details of a movie title, from the cache when possible.
+
+        Args:
+            title (str): The movie title.
+            priority (str): INTERACTIVE or BACKGROUND.
+
+        Returns:
+            dict: The OMDb response.
+
+        Raises:
+            QuotaExceeded: If the budget is exhausted and the title is not cached.
+            ValueError: If OMDb returned an error and the title is not cached.
+        """
+        key = title.strip().lower()
+        with self._lock:
+            self.counters[f'requests_{priority}'] += 1
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+
+        if entry is not None:
+            data, fetched_at = entry
+            if time.time() - fetched_at < self.fresh_ttl:
+                self._count('cache_hits')
+                return data
+            self._count('stale_hits')
+            self._revalidate(key, title)
+            return data
+
+        if not self._acquire(priority):
+            self._count(f'throttled_{priority}')
+            raise QuotaExceeded("OMDb request budget exhausted, please try again later",
+                                retry_after=self._retry_after(priority))
+        return self._fetch_and_store(key, title)
+
+    def peek(self, title):
+        """Return the cached OMDb response of a title, fresh or stale, without any upstream call."""
+        entry = self._cache.get(title.strip().lower())
+        return entry[0] if entry is not None else None
+
+    def stats(self):
+        """
+        Report the counters and the remaining budgets.
+
+        Returns:
+            dict: The counters of this process, the daily budget shared by all
+                  processes, and the cache size.
+        """
+        with self._lock:
+            report = dict(self.counters)
+            report['cached_titles'] = len(self._cache)
+        report['daily_used'] = self.quota.used('day', DAY)
+        report['daily_limit'] = self.daily_limit
+        report['daily_resets_in'] = int(self.quota.reset_in(DAY))
+        report['interactive_reserve'] = self.interactive_reserve
+        report['per_second_limit'] = self.per_second
+        return report
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _limits(self, priority):
+        reserve = 0 if priority == INTERACTIVE else self.interactive_reserve
+        return [('day', DAY, self.daily_limit - reserve), ('second', 1, self.per_second)]
+
+    def _acquire(self, priority):
+        """Count one upstream call against the shared limits, respecting the interactive reserve."""
+        deadline = time.monotonic() + (self.max_wait if priority == INTERACTIVE else 0)
+        while True:
+            acquired, scope = self.quota.try_acquire(self._limits(priority))
+            if acquired:
+                return True
+            wait = self.quota.reset_in(1)
+            if scope == 'day' or time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def _retry_after(self, priority):
+        day_scope, period, limit = self._limits(priority)[0]
+        if self.quota.used(day_scope, period) >= limit:
+            return max(1, int(self.quota.reset_in(period)))
+        return 1
+
+    def _fetch_and_store(self, key, title):
+        self._count('upstream_calls')
+        try:
+            response = self._fetch(OMDB_URL, params={'apikey': self.api_key, 't': title}, timeout=10)
+        except requests.RequestException as e:
+            self._count('upstream_errors')
+            raise ValueError(f"Error fetching movie details from OMDB API: {e}")
+        if response.status_code != 200:
+            self._count('upstream_errors')
+            raise ValueError("Error fetching movie details from OMDB API")
+
+        data = response.json()
+        with self._lock:
+            self._cache[key] = (data, time.time())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return data
+
+    def _revalidate(self, key, title):
+        """Refresh a stale entry in a background thread if the background budget allows it."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                if self._acquire(BACKGROUND):
+                    self._count('revalidations')
+                    self._fetch_and_store(key, title)
+                else:
+                    self._count('throttled_background')
+            except ValueError:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
@@ -0,0 +1,142 @@
+import hashlib
+import io
+import os
+import threading
+import time
+
+import requests
+from PIL import Image, ImageOps
+
+from fileutils import write_atomic
+
+POSTER_DIR = 'posters'
+
+# Every thumbnail is cropped and scaled to the same size, so pages can reserve the space
+THUMBNAIL_SIZE = (200, 300)
+THUMBNAIL_QUALITY = 85
+
+# Posters larger than this are not downloaded
+POSTER_MAX_BYTES = 5 * 1024 * 1024
+
+# Seconds before a failed poster download is tried again
+POSTER_RETRY_AFTER = 3600
+
+
+class PosterCache:
+    """
+    A content-addressed store of poster thumbnails on the local disk.
+
+    Each poster is downloaded once, scaled to THUMBNAIL_SIZE and stored as a JPEG
+    named after the SHA-256 of its bytes, so the same image is stored once and a
+    file never changes once written. Downloads of the same URL by concurrent
+    threads are collapsed into one, and a failed URL is not tried again for
+    POSTER_RETRY_AFTER seconds.
+
+    Attributes:
+        root (str): The directory the thumbnails are stored in.
+        size (tuple): The (width, height) of the thumbnails.
+    """
+
+    def __init__(self, root=POSTER_DIR, size=THUMBNAIL_SIZE, fetch=requests.get, max_bytes=POSTER_MAX_BYTES):
+        self.root = root
+        self.size = size
+        self.max_bytes = max_bytes
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._downloads = {}
+        self._failures = {}
+
+    def path(self, digest):
+        """Return the file path of the thumbnail with the given digest."""
+        return os.path.join(self.root, digest[:2], digest + '.jpg')
+
+    def exists(self, digest):
+        """Return True if the thumbnail with the given digest is on disk."""
+        return bool(digest) and os.path.exists(self.path(digest))
+
+    def fetch(self, url):
+        """
+        Download a poster and store its thumbnail, once per URL at a time.
+
+        Args:
+            url (str): The poster URL.
+
+        Returns:
+            str: The digest of the stored thumbnail.
+
+        Raises:
+            ValueError: If the poster cannot be downloaded or is not an image.
+        """
+        with self._lock:
+            failed_at = self._failures.get(url)
+            if failed_at is not None and time.monotonic() - failed_at < POSTER_RETRY_AFTER:
+                raise ValueError("Poster download failed recently")
+            download = self._downloads.get(url)
+            owner = download is None
+            if owner:
+                download = self._downloads[url] = {'done': threading.Event()}
+
+        if not owner:
+            download['done'].wait(timeout=30)
+            if 'digest' not in download:
+                raise ValueError(download.get('error', "Poster download failed"))
+            return download['digest']
+
+        try:
+            download['digest'] = self.store(self._download(url))
+            return download['digest']
+        except ValueError as e:
+            download['error'] = str(e)
+            with self._lock:
+                self._failures[url] = time.monotonic()
+            raise
+        finally:
+            download['done'].set()
+            with self._lock:
+                self._downloads.pop(url, None)
+
+    def store(self, data):
+        """
+        Scale an image to a thumbnail and write it to the store.
+
+        Args:
+            data (bytes): The original image.
+
+        Returns:
+            str: The SHA-256 digest of the thumbnail.
+
+        Raises:
+            ValueError: If the data is not a readable image.
+        """
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                thumbnail = ImageOps.fit(image.convert('RGB'), self.size, Image.LANCZOS)
+        except (OSError, Image.DecompressionBombError) as e:
+            raise ValueError(f"Poster is not a valid image: {e}")
+
+        output = io.BytesIO()
+        thumbnail.save(output, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+        jpeg = output.getvalue()
+        digest = hashlib.sha256(jpeg).hexdigest()
+
+        path = self.path(digest)
+        if not os.path.exists(path):
+            write_atomic(path, jpeg)
+        return digest
+
+    def _download(self, url):
+        try:
+            response = self._fetch(url, timeout=10, stream=True)
+        except requests.RequestException as e:
+            raise ValueError(f"Error downloading poster: {e}")
+        try:
+            if response.status_code != 200:
+                raise ValueError(f"Error downloading poster: HTTP {response.status_code}")
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data.extend(chunk)
+                if len(data) > self.max_bytes:
+                    raise ValueError("Poster is too large")
+            return bytes(data)
+        finally:
+            response.close()
@@ -0,0 +1,244 @@
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+
+class RecommendationEngine:
+    """
+    Item-to-item recommendations computed from the favorites co-occurrence matrix.
+
+    A full build computes the item x item co-occurrence counts (X^T X of the binary
+    user x item favorites matrix) and the cosine similarities in vectorized sparse
+    batches, keeping the top-k most similar items for every item. The counts are
+    then kept as one sparse row (a dict) per item, so favorite changes update them
+    in place and only recompute the neighbor lists of the affected items. Looking up
+    recommendations only reads the precomputed neighbor lists.
+
+    Attributes:
+        top_k (int): The number of neighbors kept per item.
+        batch_size (int): The number of items scored per vectorized batch in a full build.
+        neighbors (dict): Maps an item key to a list of (item key, score) tuples.
+        built (bool): Whether the engine has been built from the database.
+        built_at (float): The time of the last full build.
+    """
+
+    def __init__(self, top_k=20, batch_size=1024):
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.neighbors = {}
+        self.built = False
+        self.built_at = 0.0
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._item_index = {}
+        self._items = []
+        self._user_items = {}
+        self._cooc = []
+        self._counts = np.zeros(0, dtype=np.float64)
+
+    def build(self, pairs):
+        """
+        Rebuild the co-occurrence matrix and all neighbor lists from scratch.
+
+        Args:
+            pairs (iterable): An iterable of (user_id, item key) favorite pairs.
+        """
+        with self._lock:
+            self._reset()
+            user_rows = []
+            item_cols = []
+            user_index = {}
+            for user_id, item in pairs:
+                col = self._column(item)
+                row = user_index.setdefault(user_id, len(user_index))
+                if col not in self._user_items.setdefault(user_id, set()):
+                    self._user_items[user_id].add(col)
+                    user_rows.append(row)
+                    item_cols.append(col)
+
+            n_items = len(self._items)
+            favorites = sparse.csr_matrix(
+                (np.ones(len(user_rows)), (user_rows, item_cols)),
+                shape=(len(user_index), n_items),
+            )
+            cooc = (favorites.T @ favorites).tocsr()
+            self._counts = cooc.diagonal().astype(np.float64)
+            self._cooc = [
+                dict(zip(cooc.indices[lo:hi].tolist(), cooc.data[lo:hi].tolist()))
+                for lo, hi in zip(cooc.indptr[:-1], cooc.indptr[1:])
+            ]
+            for col, row in enumerate(self._cooc):
+                row.pop(col, None)
+
+            self.neighbors = {}
+            inv_norms = self._inverse_norms()
+            for start in range(0, n_items, self.batch_size):
+                stop = min(start + self.batch_size, n_items)
+                block = sparse.diags(inv_norms[start:stop]) @ cooc[start:stop] @ sparse.diags(inv_norms)
+                block = block.tocsr()
+                for offset in range(stop - start):
+                    lo, hi = block.indptr[offset], block.indptr[offset + 1]
+                    self._store_neighbors(start + offset, block.indices[lo:hi], block.data[lo:hi])
+            self.built = True
+            self.built_at = time.time()
+
+    def add_favorite(self, user_id, item):
+        """
+        Record that a user favorited an item and refresh the affected neighbor lists.
+
+        Args:
+            user_id (int): The ID of the user.
+            item: The item key of the favorited movie.
+        """
+        with self._lock:
+            col = self._column(item)
+            user_items = self._user_items.setdefault(user_id, set())
+            if col in user_items:
+                return
+            for other in user_items:
+                self._cooc[col][other] = self._cooc[col].get(other, 0) + 1
+                self._cooc[other][col] = self._cooc[other].get(col, 0) + 1
+            self._counts[col] += 1
+            changed = set(user_items)
+            user_items.add(col)
+            self._refresh(col, changed, self._cooc[col])
+
+    def remove_favorite(self, user_id, item):
+        """
+        Record that a user removed an item from their favorites and refresh the affected neighbor lists.
+
+        Args:
+            user_id (int): The ID of the user.
+            item: The item key of the movie that is no longer a favorite.
+        """
+        with self._lock:
+            col = self._item_index.get(item)
+            user_items = self._user_items.get(user_id)
+            if col is None or not user_items or col not in user_items:
+                return
+            user_items.discard(col)
+            affected = set(self._cooc[col])
+            for other in user_items:
+                for row, key in ((col, other), (other, col)):
+                    if self._cooc[row][key] <= 1:
+                        del self._cooc[row][key]
+                    else:
+                        self._cooc[row][key] -= 1
+            self._counts[col] -= 1
+            self._refresh(col, user_items, affected)
+
+    def similar_items(self, item, limit=10):
+        """
+        Retrieve the items most often favorited together with an item.
+
+        Args:
+            item: The item key.
+            limit (int): The maximum number of items returned.
+
+        Returns:
+            list: A list of (item key, score) tuples, best match first.
+        """
+        return self.neighbors.get(item, [])[:limit]
+
+    def recommend(self, user_id, limit=10):
+        """
+        Recommend items for a user by averaging the neighbor scores of their favorites.
+
+        An item is ranked by the summed cosine similarity to the user's favorites, so
+        items close to several favorites come first. The reported score is that sum
+        divided by the number of favorites listing the item as a neighbor, which keeps
+        it between 0 and 1.
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int): The maximum number of items returned.
+
+        Returns:
+            list: A list of (item key, score) tuples, best match first, excluding
+                  items the user already favorited.
+        """
+        with self._lock:
+            owned = {self._items[col] for col in self._user_items.get(user_id, ())}
+            totals = {}
+            for item in owned:
+                for neighbor, score in self.neighbors.get(item, ()):
+                    if neighbor not in owned:
+                        total, count = totals.get(neighbor, (0.0, 0))
+                        totals[neighbor] = (total + score, count + 1)
+        ranked = sorted(totals.items(), key=lambda entry: (-entry[1][0], str(entry[0])))[:limit]
+        return [(item, total / count) for item, (total, count) in ranked]
+
+    def _column(self, item):
+        """Return the matrix column of an item, growing the matrix for unseen items."""
+        col = self._item_index.get(item)
+        if col is None:
+            col = len(self._items)
+            self._item_index[item] = col
+            self._items.append(item)
+            self._cooc.append({})
+            if col >= len(self._counts):
+                capacity = max(16, 2 * len(self._counts))
+                self._counts = np.concatenate([self._counts, np.zeros(capacity - len(self._counts))])
+        return col
+
+    def _inverse_norms(self):
+        norms = np.sqrt(self._counts)
+        inv_norms = np.zeros_like(norms)
+        np.divide(1.0, norms, out=inv_norms, where=norms > 0)
+        return inv_norms
+
+    def _refresh(self, col, changed, neighbors):
+        """
+        Bring the neighbor lists up to date after the favorites of one item changed.
+
+        The item itself and the items whose co-occurrence count with it changed are
+        rescored in full. For every other co-occurring item only the score against
+        the changed item moved (through its norm), so its list is patched in place
+        unless the change could promote an item that is not in the list.
+        """
+        inv_norms = self._inverse_norms()
+        for row in {col, *changed}:
+            self._rescore(row, inv_norms)
+        for row in set(neighbors) - changed - {col}:
+            score = self._cooc[row][col] * inv_norms[row] * inv_norms[col]
+            if not self._patch(row, col, score):
+                self._rescore(row, inv_norms)
+
+    def _rescore(self, row, inv_norms):
+        counts = self._cooc[row]
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        data = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        self._store_neighbors(row, indices, data * inv_norms[row] * inv_norms[indices])
+
+    def _patch(self, row, col, score):
+        """Update one score in a neighbor list, returning False when the row must be rescored."""
+        item, other = self._items[row], self._items[col]
+        current = [entry for entry in self.neighbors.get(item, []) if entry[0] != other]
+        was_listed = len(current) < len(self.neighbors.get(item, []))
+        full = len(self._cooc[row]) > self.top_k
+        if was_listed and full and current and score < current[-1][1]:
+            return False
+        if len(current) < self.top_k or score > current[-1][1]:
+            current.append((other, float(score)))
+            current.sort(key=lambda entry: -entry[1])
+            current = current[:self.top_k]
+        self.neighbors[item] = current
+        return True
+
+    def _store_neighbors(self, col, indices, scores):
+        """Keep the top-k scoring items of a row, excluding the item itself."""
+        mask = (indices != col) & (scores > 0)
+        indices, scores = indices[mask], scores[mask]
+        if len(scores) > self.top_k:
+            top = np.argpartition(-scores, self.top_k)[:self.top_k]
+            indices, scores = indices[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        item = self._items[col]
+        if len(order) == 0:
+            self.neighbors.pop(item, None)
+            return
+        self.neighbors[item] = [(self._items[i], float(s)) for i, s in zip(indices[order], scores[order])]
@@ -2,40 +2,142 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import json
 import os
 import sys
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Append the 'workspace' directory to the sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from datamanager.data_manager import DataManagerInterface
+from datamanager.recommendations import RecommendationEngine
+from datamanager.omdb import OmdbClient, SharedQuota, QuotaExceeded, INTERACTIVE, BACKGROUND
+from datamanager import stats, migrations
+from datamanager.group_commit import GroupCommitter
+from datamanager.posters import PosterCache
+from database import configure_sqlite
+from models.stats import MovieStats, GenreStats
+from models.catalog import CatalogMovie
 from models.user import User
 from models.movie import Movie
 from models.user import UserFavoriteMovies
 from models.review import Review
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-import requests
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.exc import IntegrityError  # Import IntegrityError for handling database integrity issues
 from flask import flash  # Import flash for displaying flash messages
-from sqlalchemy.orm.exc import NoResultFound  # Import NoResultFound for handling query result not found
 from sqlalchemy.orm import sessionmaker, scoped_session
 
 OMDB_API_KEY = 'cdd1ad1b'
 
+# Seconds after which a worker rebuilds its recommendations in the background, so
+# that favorites written by other worker processes are picked up
+RECOMMENDATIONS_MAX_AGE = 300
+
+# The most movies whose details can be requested at once, and the number of
+# OMDb lookups a batch runs concurrently
+DETAILS_BATCH_LIMIT = 50
+DETAILS_FETCH_WORKERS = 4
+
+# Column layout of each dataset that can be exported
+EXPORT_DATASETS = {
+    'users': ['id', 'name', 'email'],
+    'movies': ['id', 'user_id', 'catalog_id', 'title', 'genre'],
+    'favorites': ['user_id', 'movie_id', 'catalog_id', 'title'],
+    'reviews': ['id', 'user_id', 'movie_id', 'rating', 'review_text'],
+    'catalog': ['id', 'imdb_id', 'title', 'year', 'genre'],
+}
+
 class SQLiteDataManager(DataManagerInterface):
     def __init__(self, db_file_name):
       print("Initializing SQLiteDataManager with database file:", db_file_name)
       self.engine = create_engine(db_file_name)
-      self.Session = sessionmaker(bind=self.engine)
-      self.session = self.Session()
+      configure_sqlite(self.engine)
+      self.session_factory = sessionmaker(bind=self.engine)
+      # One session per thread; close_session() ends it at the end of a request
+      self.Session = scoped_session(self.session_factory)
+      self.recommendations = RecommendationEngine()
+      self._rebuild_lock = threading.Lock()
+      self._rebuild_thread = None
+      self._pending_favorites = None
+      # The OMDb budget is counted in the database, shared by all worker processes
+      self.omdb = OmdbClient(OMDB_API_KEY, SharedQuota(self.engine))
+      self.posters = PosterCache()
+      self.group_commit = None
+      os.register_at_fork(after_in_child=self.reinit_after_fork)
       # Add debug prints or logging statements here
       print("Tables present:", self.engine.table_names())
+
+    @property
+    def session(self):
+        """The SQLAlchemy session of the current thread."""
+        return self.Session()
     
     def close_session(self):
         self.Session.remove()
 
+    def reinit_after_fork(self):
+        """
+        Give a forked worker process its own connection pool, sessions and caches.
+
+        A pre-forking server that preloads the app copies the parent's engine and
+        session into every worker. This replaces the connection pool without closing
+        the parent's connections, drops the inherited session, and recreates the
+        in-memory state whose locks may have been held by another thread at fork
+        time. The OMDb budget itself lives in the database and is shared by all workers.
+
+        A fork copies no threads either. The background threads of the group
+        committer, the request profiler's sampler and the backup scheduler are
+        therefore started on first use and remember the process that started
+        them, so each worker starts its own.
+        """
+        self.engine.dispose(close=False)
+        self.Session.registry.clear()
+        self.recommendations = RecommendationEngine()
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_thread = None
+        self._pending_favorites = None
+        self.omdb = OmdbClient(OMDB_API_KEY, self.omdb.quota)
+        self.posters = PosterCache(self.posters.root, self.posters.size)
+
+
+    def enable_group_commit(self, interval=0.005, max_batch=100):
+        """
+        Batch the high-volume writes of concurrent requests into shared transactions.
+
+        In group-commit mode add_user, add_review, delete_review and the favorite
+        writes are queued and committed together every `interval` seconds or
+        `max_batch` operations, so one commit (and fsync) covers many requests.
+        Each call still blocks until its own write is committed and raises its own error.
+
+        Args:
+            interval (float): The maximum time in seconds a write waits for its batch.
+            max_batch (int): The maximum number of writes per transaction.
+        """
+        self.group_commit = GroupCommitter(self.session_factory, interval=interval, max_batch=max_batch)
+
+    def _write(self, operation):
+        """
+        Run a write operation and commit it, through the group committer when enabled.
+
+        Args:
+            operation (callable): A function taking a session and returning a plain value.
+
+        Returns:
+            The return value of the operation.
+        """
+        if self.group_commit is not None:
+            return self.group_commit.run(operation)
+
+        try:
+            result = operation(self.session)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return result
 
     def commit_changes(self):
         self.session.commit()
@@ -65,14 +167,32 @@ class SQLiteDataManager(DataManagerInterface):
 
         Args:
             user (User): The User instance to be added to the database.
+
+        Returns:
+            int: The ID of the new user.
+
+        Raises:
+            IntegrityError: If a user with the same email address already exists.
         """
-        self.session.add(user)
-        self.session.commit()
+        if self.group_commit is None:
+            return self._write(lambda session: self._add(session, user).id)
+
+        name, email = user.name, user.email
+        return self._write(lambda session: self._add(session, User(name=name, email=email)).id)
+
+    @staticmethod
+    def _add(session, instance):
+        session.add(instance)
+        session.flush()
+        return instance
 
     def add_movie(self, user_id, title, genre):
         """
         Add a new movie to a user's list of favorite movies.
 
+        The title is looked up in the shared catalog first, so OMDb is only queried
+        for titles that nobody has added yet.
+
       Args:
         user_id (int): The ID of the user to whom the movie will be added.
         title (str): The title of the movie to be added.
@@ -86,20 +206,20 @@ class SQLiteDataManager(DataManagerInterface):
       """
         user = self.session.query(User).get(user_id)
         if user:
-            # Fetch movie details using OMDB API    
-            movie_details = self.get_movie_details_by_name(title)
-            
-            if not movie_details:
+            catalog = self.get_catalog_movie(title)
+            if catalog is None:
                 raise ValueError("Movie not found in OMDB API")
-        
-        # Check if the movie already exists in the user's favorite list
-            existing_movie = self.session.query(Movie).filter_by(user=user, title=movie_details['Title']).first()
+
+            # Check if the movie already exists in the user's favorite list
+            existing_movie = self.session.query(Movie).filter_by(user=user, catalog=catalog).first()
             if existing_movie:
                 flash("Movie is already in favorites", "info")
                 return
 
-            new_movie = Movie(title=movie_details['Title'], genre=genre, user=user)
+            new_movie = Movie(catalog=catalog, genre=genre, user=user)
             self.session.add(new_movie)
+            self.session.flush()
+            stats.record_movie(self.session, catalog.id, genre, 1)
             self.session.commit()
 
             # Now, let's perform the cleanup to delete orphaned favorite movies
@@ -109,25 +229,94 @@ class SQLiteDataManager(DataManagerInterface):
                 flash(f"Error deleting orphaned favorite movies: {str(e)}", "error")
         else:
             flash("User not found", "error")
+
+    def get_catalog_movie(self, title, priority=INTERACTIVE):
+        """
+        Find or create the shared catalog entry of a movie title.
+
+        Known titles are matched case-insensitively without any upstream call.
+        Otherwise OMDb resolves the title, and the entry with the same imdbID is
+        reused if one exists (e.g. for an alternative spelling of the title).
+
+        Args:
+            title (str): The title of the movie.
+            priority (str): The OMDb quota priority, INTERACTIVE or BACKGROUND.
+
+        Returns:
+            CatalogMovie: The catalog entry, or None if OMDb does not know the title.
+        """
+        title = title.strip()
+        catalog = self.session.query(CatalogMovie).filter(CatalogMovie.title == title).first()
+        if catalog:
+            return catalog
+
+        movie_details = self.get_movie_details_by_name(title, priority=priority)
+        if not movie_details or movie_details.get('Response') == 'False':
+            return None
+
+        imdb_id = movie_details.get('imdbID')
+        catalog = self.session.query(CatalogMovie).filter_by(imdb_id=imdb_id).first() if imdb_id else None
+        if catalog is None:
+            # Entries migrated without an OMDb lookup are matched by their title
+            catalog = self.session.query(CatalogMovie) \
+                .filter(CatalogMovie.title == movie_details.get('Title', title), CatalogMovie.imdb_id.is_(None)) \
+                .first() or CatalogMovie(title=movie_details.get('Title', title))
+            migrations.apply_omdb_details(catalog, movie_details)
+            self.session.add(catalog)
+            try:
+                self.session.flush()
+            except IntegrityError:
+                # Another request added the same movie since the lookup above; use its entry
+                self.session.rollback()
+                catalog = self.session.query(CatalogMovie).filter_by(imdb_id=imdb_id).first()
+                if catalog is None:
+                    raise
+        return catalog
         
     def update_movie(self, user_id, movie_id, title, genre):
         """
         Update the details of a movie.
 
+        Changing the title points the movie at the catalog entry of the new title.
+
         Args:
             user_id (int): The ID of the user.
             movie_id (int): The ID of the movie to be updated.
             title (str): The updated name of the movie.
             genre (str): The updated genre of the movie.
+
+        Raises:
+            ValueError: If the new title is not found in the OMDB API.
         """
         user = self.session.query(User).get(user_id)
         if user:
             movie = self.session.query(Movie).get(movie_id)
             if movie:
-                movie.title = title
+                old_catalog_id = movie.catalog_id
+                catalog = movie.catalog
+                if title and title.strip().lower() != (movie.title or '').lower():
+                    catalog = self.get_catalog_movie(title)
+                    if catalog is None:
+                        raise ValueError("Movie not found in OMDB API")
+                    if catalog.id != old_catalog_id and self.session.query(Movie) \
+                            .filter_by(user_id=movie.user_id, catalog_id=catalog.id).first():
+                        raise ValueError("Movie is already in the user's list")
+
+                if catalog.id != old_catalog_id or movie.genre != genre:
+                    contribution = stats.movie_contribution(self.session, movie)
+                    stats.record_movie(self.session, old_catalog_id, movie.genre, -1, **contribution)
+                    stats.record_movie(self.session, catalog.id, genre, 1, **contribution)
+                movie.catalog = catalog
                 movie.genre = genre
                 self.session.commit()
 
+                if movie.catalog_id != old_catalog_id:
+                    changes = []
+                    for (fan_id,) in self.session.query(UserFavoriteMovies.user_id).filter_by(movie_id=movie.id):
+                        changes.append((fan_id, old_catalog_id, False))
+                        changes.append((fan_id, movie.catalog_id, True))
+                    self._update_recommendations(changes)
+
     def delete_movie(self, movie_id):
         """
         Delete a movie from the database.
@@ -137,18 +326,47 @@ class SQLiteDataManager(DataManagerInterface):
         """
         movie = self.session.query(Movie).get(movie_id)
         if movie:
+            catalog_id = movie.catalog_id
+            contribution = stats.movie_contribution(self.session, movie)
+            stats.record_movie(self.session, catalog_id, movie.genre, -1, **contribution)
+            favorites = self.session.query(UserFavoriteMovies).filter_by(movie_id=movie.id)
+            fan_ids = [favorite.user_id for favorite in favorites]
+            favorites.delete(synchronize_session=False)
             self.session.delete(movie)
             self.session.commit()
 
+            self._update_recommendations([(fan_id, catalog_id, False) for fan_id in fan_ids])
+
     def add_review(self, review):
         """
         Add a new review to the database.
 
         Args:
             review (Review): The Review instance to be added to the database.
+
+        Returns:
+            int: The ID of the new review.
         """
-        self.session.add(review)
-        self.session.commit()
+        if self.group_commit is None:
+            return self._write(lambda session: self._add_review(session, review))
+
+        user_id = review.user.id if review.user else review.user_id
+        movie_id = review.movie.id if review.movie else review.movie_id
+        review_text, rating = review.review_text, review.rating
+        # The review is written by the group committer's session; drop the copy
+        # that the user/movie relationships cascaded into this thread's session
+        self.session.rollback()
+        return self._write(lambda session: self._add_review(session, Review(
+            user_id=user_id, movie_id=movie_id, review_text=review_text, rating=rating)))
+
+    def _add_review(self, session, review):
+        session.add(review)
+        # The rollups only need these two columns, which is cheaper than loading the movie
+        movie = review.movie or session.query(Movie.catalog_id, Movie.genre).filter(Movie.id == review.movie_id).first()
+        if movie:
+            stats.record_review(session, movie, 1, review.rating or 0)
+        session.flush()
+        return review.id
 
     def update_review(self, review):
         """
@@ -157,6 +375,9 @@ class SQLiteDataManager(DataManagerInterface):
         Args:
             review (Review): The Review instance with updated information.
         """
+        history = inspect(review).attrs.rating.history
+        if history.deleted and review.movie:
+            stats.record_review(self.session, review.movie, 0, (review.rating or 0) - (history.deleted[0] or 0))
         self.session.commit()
 
     def delete_review(self, review_id):
@@ -165,11 +386,20 @@ class SQLiteDataManager(DataManagerInterface):
 
         Args:
             review_id (int): The ID of the review to be deleted.
+
+        Returns:
+            bool: True if the review existed and was deleted.
         """
-        review = self.session.query(Review).get(review_id)
-        if review:
-            self.session.delete(review)
-            self.session.commit()
+        def operation(session):
+            review = session.query(Review).get(review_id)
+            if not review:
+                return False
+            if review.movie:
+                stats.record_review(session, review.movie, -1, -(review.rating or 0))
+            session.delete(review)
+            return True
+
+        return self._write(operation)
 
     def get_review(self, review_id):
         """
@@ -185,16 +415,19 @@ class SQLiteDataManager(DataManagerInterface):
 
     def get_movie_reviews(self, movie_id):
         """
-        Retrieve a list of reviews for a specific movie.
+        Retrieve the reviews of a movie from every user who has it in their library.
 
         Args:
             movie_id (int): The ID of the movie.
 
         Returns:
-            list: A list of Review instances associated with the given movie ID.
+            list: A list of Review instances of the movie's catalog entry, oldest first.
         """
         movie = self.session.query(Movie).get(movie_id)
-        return movie.reviews if movie else []
+        if movie is None:
+            return []
+        return self.session.query(Review).join(Movie, Movie.id == Review.movie_id) \
+            .filter(Movie.catalog_id == movie.catalog_id).order_by(Review.id).all()
 
     def get_user_name(self, user_id):
         """
@@ -254,21 +487,231 @@ class SQLiteDataManager(DataManagerInterface):
         If the movie is already in the user's favorite list, it will not be added again.
         Any issues during the update process will be rolled back and appropriate messages will be flashed.
         """
-        user = self.session.query(User).get(user_id)
-        movie = self.session.query(Movie).get(movie_id)
-
-        if user and movie:
-            try:
-                user.favorite_movies.append(movie)
-                self.session.commit()
+        def operation(session):
+            user = session.query(User).get(user_id)
+            movie = session.query(Movie).get(movie_id)
+            if not (user and movie):
+                return None
+            user.favorite_movies.append(movie)
+            stats.record_favorite(session, movie, 1)
+            session.flush()
+            return user.id, movie.catalog_id
+
+        try:
+            added = self._write(operation)
+            if added:
+                self._update_recommendations([added + (True,)])
                 flash("Favorite movies updated successfully", "success")
-            except IntegrityError:
-                self.session.rollback()
-                flash("Movie is already in favorites", "info")
-            except Exception as e:
-                self.session.rollback()
-                flash(f"Error occurred while updating favorites: {str(e)}", "error")
+        except IntegrityError:
+            flash("Movie is already in favorites", "info")
+        except Exception as e:
+            flash(f"Error occurred while updating favorites: {str(e)}", "error")
+
+
+    def set_favorite_movies(self, user_id, movie_ids):
+        """
+        Replace which of a user's movies are marked as favorites.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_ids (list): The IDs of the user's movies that should be favorites.
+                              The user's other movies are removed from the favorites.
+
+        Returns:
+            tuple: The lists of movie titles that were added to and removed from the favorites,
+                   or None if the user does not exist.
+        """
+        wanted = {int(movie_id) for movie_id in movie_ids}
+
+        def operation(session):
+            user = session.query(User).get(user_id)
+            if not user:
+                return None
+
+            favorites = set(user.favorite_movies)
+            added = []
+            removed = []
+            for movie in session.query(Movie).filter_by(user_id=user.id):
+                if movie.id in wanted and movie not in favorites:
+                    user.favorite_movies.append(movie)
+                    stats.record_favorite(session, movie, 1)
+                    added.append((movie.catalog_id, movie.title))
+                elif movie.id not in wanted and movie in favorites:
+                    user.favorite_movies.remove(movie)
+                    stats.record_favorite(session, movie, -1)
+                    removed.append((movie.catalog_id, movie.title))
+            session.flush()
+            return user.id, added, removed
+
+        result = self._write(operation)
+        if result is None:
+            return None
+
+        user_id, added, removed = result
+        self._update_recommendations([(user_id, catalog_id, True) for catalog_id, title in added] +
+                                     [(user_id, catalog_id, False) for catalog_id, title in removed])
+        return [title for catalog_id, title in added], [title for catalog_id, title in removed]
+
+    def get_recommendations(self, user_id, limit=10):
+        """
+        Recommend movies favorited by users with similar favorites.
+
+        The recommendation engine is built from the favorites table on first use and
+        kept up to date by the favorite write paths afterwards. Once it is older than
+        RECOMMENDATIONS_MAX_AGE it is rebuilt in a background thread while requests
+        keep using the current one; only the first build is waited for.
 
+        Args:
+            user_id (int): The ID of the user.
+            limit (int): The maximum number of recommendations.
+
+        Returns:
+            list: A list of dictionaries with the 'catalog_id', 'title' and similarity 'score' of each movie.
+        """
+        if not self.recommendations.built:
+            self.refresh_recommendations(wait=True)
+        elif time.time() - self.recommendations.built_at > RECOMMENDATIONS_MAX_AGE:
+            self.refresh_recommendations()
+
+        recommended = self.recommendations.recommend(int(user_id), limit)
+        titles = dict(self.session.query(CatalogMovie.id, CatalogMovie.title)
+                      .filter(CatalogMovie.id.in_([catalog_id for catalog_id, score in recommended])))
+        return [
+            {'catalog_id': catalog_id, 'title': titles.get(catalog_id), 'score': round(score, 4)}
+            for catalog_id, score in recommended
+        ]
+
+    def refresh_recommendations(self, wait=False):
+        """
+        Rebuild the recommendation engine in a background thread and swap it in when done.
+
+        Favorite changes made while the new engine is being built are recorded and
+        replayed onto it before the swap, so none are lost. If a rebuild is already
+        running no second one is started.
+
+        Args:
+            wait (bool): Whether to block until the rebuild has finished.
+        """
+        with self._rebuild_lock:
+            thread = self._rebuild_thread
+            if thread is None or not thread.is_alive():
+                # Record changes before the new engine reads the favorites, so a change
+                # committed after its snapshot is replayed
+                self._pending_favorites = []
+                thread = self._rebuild_thread = threading.Thread(
+                    target=self._rebuild_recommendations, name='recommendations', daemon=True)
+                thread.start()
+        if wait:
+            thread.join()
+
+    def _rebuild_recommendations(self):
+        engine = RecommendationEngine()
+        session = self.session_factory()
+        try:
+            pairs = session.query(UserFavoriteMovies.user_id, Movie.catalog_id) \
+                .join(Movie, Movie.id == UserFavoriteMovies.movie_id) \
+                .yield_per(10000)
+            engine.build(pairs)
+        except Exception as e:
+            print("Rebuilding the recommendations failed:", e)
+            engine = None
+        finally:
+            session.close()
+
+        with self._rebuild_lock:
+            if engine is not None:
+                # Replaying is safe for changes the snapshot already contains: adding a
+                # favorite twice or removing a missing one does nothing
+                self._apply_favorite_changes(engine, self._pending_favorites)
+                self.recommendations = engine
+            self._pending_favorites = None
+
+    def _update_recommendations(self, changes):
+        """
+        Apply favorite changes to the recommendation engine and to a rebuild in progress.
+
+        Args:
+            changes (list): A list of (user_id, catalog_id, favorite) tuples, where
+                            favorite is False for a removed favorite.
+        """
+        if not changes:
+            return
+        with self._rebuild_lock:
+            if self._pending_favorites is not None:
+                self._pending_favorites.extend(changes)
+            if self.recommendations.built:
+                self._apply_favorite_changes(self.recommendations, changes)
+
+    @staticmethod
+    def _apply_favorite_changes(engine, changes):
+        for user_id, catalog_id, favorite in changes:
+            if favorite:
+                engine.add_favorite(user_id, catalog_id)
+            else:
+                engine.remove_favorite(user_id, catalog_id)
+
+    def rebuild_stats(self):
+        """
+        Recompute the leaderboard and genre rollup tables from scratch.
+
+        Returns:
+            int: The number of catalog titles in the rebuilt rollups.
+        """
+        try:
+            stats.rebuild(self.session)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return self.session.query(MovieStats).count()
+
+    def ensure_stats(self):
+        """Build the rollup tables if they are empty while there are movies, e.g. right after upgrading."""
+        if self.session.query(MovieStats.catalog_id).first() is None and self.session.query(Movie.id).first() is not None:
+            self.rebuild_stats()
+
+    def get_leaderboard(self, limit=10):
+        """
+        Retrieve the global movie leaderboards from the rollup tables.
+
+        Args:
+            limit (int): The number of movies per leaderboard.
+
+        Returns:
+            dict: The 'top_rated', 'most_favorited' and 'most_added' lists of movie statistics.
+        """
+        query = self.session.query(MovieStats, CatalogMovie.title) \
+            .join(CatalogMovie, CatalogMovie.id == MovieStats.catalog_id)
+        return {
+            'top_rated': [self._movie_stats_dict(*row) for row in query.filter(MovieStats.avg_rating.isnot(None))
+                          .order_by(MovieStats.avg_rating.desc(), MovieStats.review_count.desc(), CatalogMovie.title).limit(limit)],
+            'most_favorited': [self._movie_stats_dict(*row) for row in query.filter(MovieStats.favorites_count > 0)
+                               .order_by(MovieStats.favorites_count.desc(), CatalogMovie.title).limit(limit)],
+            'most_added': [self._movie_stats_dict(*row) for row in query
+                           .order_by(MovieStats.library_count.desc(), CatalogMovie.title).limit(limit)],
+        }
+
+    def get_genre_stats(self, limit=50):
+        """
+        Retrieve per-genre movie counts and average ratings from the rollup tables.
+
+        Args:
+            limit (int): The maximum number of genres.
+
+        Returns:
+            list: A list of dictionaries with the statistics of each genre, most common first.
+        """
+        rows = self.session.query(GenreStats).order_by(GenreStats.movie_count.desc(), GenreStats.genre).limit(limit)
+        return [
+            {'genre': row.genre, 'movie_count': row.movie_count, 'favorites_count': row.favorites_count,
+             'review_count': row.review_count, 'avg_rating': row.avg_rating}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _movie_stats_dict(row, title):
+        return {'catalog_id': row.catalog_id, 'title': title, 'library_count': row.library_count, 'favorites_count': row.favorites_count,
+                'review_count': row.review_count, 'avg_rating': row.avg_rating}
 
     def get_user_favorite_movies(self, user_id):
             """
@@ -287,61 +730,225 @@ class SQLiteDataManager(DataManagerInterface):
                 flash("User not found", "error")
                 return []
 
-    def get_movie_details(self, title):
+    def get_poster(self, catalog_id):
+        """
+        Find the cached poster thumbnail of a catalog entry, downloading it on first use.
+
+        Args:
+            catalog_id (int): The ID of the catalog entry.
+
+        Returns:
+            tuple: The (path, digest) of the thumbnail, or None if the entry has no poster.
+
+        Raises:
+            ValueError: If the poster could not be downloaded.
+        """
+        catalog = self.session.query(CatalogMovie).get(catalog_id)
+        if catalog is None:
+            return None
+        if catalog.poster_hash and self.posters.exists(catalog.poster_hash):
+            return self.posters.path(catalog.poster_hash), catalog.poster_hash
+
+        url = catalog.poster_url
+        if url is None:
+            if catalog.details and catalog.poster_hash is None:
+                # OMDb has no poster for this title, so do not look again
+                catalog.poster_hash = ''
+                self.session.commit()
+            return None
+
+        digest = self.posters.fetch(url)
+        catalog.poster_hash = digest
+        self.session.commit()
+        return self.posters.path(digest), digest
+
+    def fetch_posters(self):
+        """
+        Make sure the posters of all catalog entries are cached, downloading the missing ones.
+
+        Returns:
+            dict: The number of 'cached' and 'failed' posters.
+        """
+        summary = {'cached': 0, 'failed': 0}
+        pending = [catalog_id for (catalog_id,) in self.session.query(CatalogMovie.id)
+                   .filter(CatalogMovie.details.isnot(None))]
+        for catalog_id in pending:
+            try:
+                if self.get_poster(catalog_id):
+                    summary['cached'] += 1
+            except ValueError as e:
+                print(f"Poster of catalog entry {catalog_id} failed:", e)
+                summary['failed'] += 1
+        return summary
+
+    def get_movie_details(self, title, priority=BACKGROUND):
         """
         Fetch movie details using the OMDB API for a given movie title.
 
         Args:
             title (str): The title of the movie for which details need to be fetched.
+            priority (str): The OMDb quota priority, INTERACTIVE or BACKGROUND.
 
         Returns:
             dict: A dictionary containing the fetched movie details.
 
         Raises:
             ValueError: If there is an error fetching movie details from the OMDB API.
+            QuotaExceeded: If the OMDb budget is exhausted and the movie is not cached.
         """
-        url = f'http://www.omdbapi.com/?apikey={OMDB_API_KEY}&t={title}'
-        response = requests.get(url)
+        return self.omdb.get(title, priority=priority)
 
-        if response.status_code != 200:
-            raise ValueError("Error fetching movie details from OMDB API")
+    def get_movie_details_batch(self, movie_ids, priority=BACKGROUND):
+        """
+        Fetch the details of several movies at once.
 
-        data = response.json()
-        return data
+        Details come from the catalog entries' stored OMDb responses and the OMDb
+        client's cache first. Only the remaining titles are looked up upstream,
+        concurrently, and the responses are stored on their catalog entries.
+
+        Args:
+            movie_ids (list): The IDs of the movies (library entries).
+            priority (str): The OMDb quota priority of the upstream lookups.
 
-    def get_movie_details_by_name(self, movie_name):
+        Returns:
+            dict: The OMDb details of each movie ID, or a dictionary with an 'error'
+                  (and a 'retry_after' when the OMDb budget is exhausted).
+        """
+        movies = self.session.query(Movie).filter(Movie.id.in_(movie_ids)).all()
+        results = {movie_id: {'error': 'Movie not found'} for movie_id in movie_ids}
+
+        misses = {}
+        for movie in movies:
+            catalog = movie.catalog
+            details = json.loads(catalog.details) if catalog.details else self.omdb.peek(catalog.title)
+            if details:
+                results[movie.id] = details
+            else:
+                misses.setdefault(catalog.id, (catalog, []))[1].append(movie.id)
+
+        def lookup(title):
+            try:
+                return self.omdb.get(title, priority=priority)
+            except QuotaExceeded as e:
+                return {'error': str(e), 'retry_after': e.retry_after}
+            except ValueError as e:
+                return {'error': str(e)}
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=min(DETAILS_FETCH_WORKERS, len(misses))) as pool:
+                fetched = list(pool.map(lookup, [catalog.title for catalog, ids in misses.values()]))
+
+            stored = False
+            for (catalog, ids), details in zip(misses.values(), fetched):
+                if details.get('Response') == 'False':
+                    details = {'error': 'Movie not found in OMDB API'}
+                elif 'error' not in details:
+                    stored = self._store_catalog_details(catalog, details) or stored
+                for movie_id in ids:
+                    results[movie_id] = details
+            if stored:
+                self.session.commit()
+        return results
+
+    def _store_catalog_details(self, catalog, details):
+        """Keep an OMDb response on a catalog entry unless its imdbID belongs to another entry."""
+        imdb_id = details.get('imdbID')
+        if catalog.imdb_id not in (None, imdb_id):
+            return False
+        if catalog.imdb_id is None and imdb_id and \
+                self.session.query(CatalogMovie.id).filter_by(imdb_id=imdb_id).first():
+            # Another entry already has this movie; `flask migrate-catalog --resolve` merges them
+            return False
+        migrations.apply_omdb_details(catalog, details)
+        return True
+
+    def get_movie_details_by_name(self, movie_name, priority=INTERACTIVE):
         """
         Fetch movie details using the OMDB API for a given movie name.
 
+        All OMDb calls go through the quota manager, which serves cached responses
+        when possible and keeps background lookups from using up the budget
+        reserved for interactive ones.
+
         Args:
             movie_name (str): The name of the movie for which details need to be fetched.
+            priority (str): The OMDb quota priority, INTERACTIVE or BACKGROUND.
 
         Returns:
             dict: A dictionary containing the fetched movie details.
 
         Raises:
             ValueError: If there is an error fetching movie details from the OMDB API.
+            QuotaExceeded: If the OMDb budget is exhausted and the movie is not cached.
         """
-        
-        url = f'http://www.omdbapi.com/?apikey={OMDB_API_KEY}&t={movie_name}'
-        
-        # Print the constructed url
-        print("Constructed URL:", url)
-        
-        response = requests.get(url)
+        return self.omdb.get(movie_name, priority=priority)
 
-        # Print the entire API response content
-        response_content = response.content.decode('utf-8')
-        print("API Response:", response_content)
-        
-        # Print the response status code
-        print("API Response Status Code:", response.status_code)
-        
-        if response.status_code != 200:
-            raise ValueError("Error fetching movie details from OMDB API")
+    def iter_export_rows(self, dataset, user_id=None, batch_size=1000):
+        """
+        Stream the rows of an export dataset without loading the table into memory.
 
-        data = response.json()
-        return data
+        The rows are read through a dedicated session with a server-side cursor
+        (``yield_per``), so the caller can start sending data after the first batch.
+
+        Args:
+            dataset (str): One of 'users', 'movies', 'favorites' or 'reviews'.
+            user_id (int, optional): Restrict the export to a single user. Exports the
+                                     whole table when omitted.
+            batch_size (int): The number of rows fetched from the cursor at a time.
+
+        Returns:
+            tuple: The list of column names and a generator of row tuples.
+
+        Raises:
+            ValueError: If the dataset is unknown.
+        """
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown export dataset: {dataset}")
+
+        columns = EXPORT_DATASETS[dataset]
+
+        def rows():
+            session = self.session_factory()
+            try:
+                query = self._export_query(session, dataset, user_id)
+                for row in query.yield_per(batch_size):
+                    yield tuple(row)
+            finally:
+                session.close()
+
+        return columns, rows()
+
+    def _export_query(self, session, dataset, user_id):
+        """Build the column query backing an export dataset, ordered by primary key."""
+        if dataset == 'users':
+            query = session.query(User.id, User.name, User.email).order_by(User.id)
+            if user_id is not None:
+                query = query.filter(User.id == user_id)
+        elif dataset == 'movies':
+            query = session.query(Movie.id, Movie.user_id, Movie.catalog_id, CatalogMovie.title, Movie.genre) \
+                .join(CatalogMovie, CatalogMovie.id == Movie.catalog_id) \
+                .order_by(Movie.id)
+            if user_id is not None:
+                query = query.filter(Movie.user_id == user_id)
+        elif dataset == 'favorites':
+            query = session.query(UserFavoriteMovies.user_id, UserFavoriteMovies.movie_id,
+                                  Movie.catalog_id, CatalogMovie.title) \
+                .join(Movie, Movie.id == UserFavoriteMovies.movie_id) \
+                .join(CatalogMovie, CatalogMovie.id == Movie.catalog_id) \
+                .order_by(UserFavoriteMovies.user_id, UserFavoriteMovies.movie_id)
+            if user_id is not None:
+                query = query.filter(UserFavoriteMovies.user_id == user_id)
+        elif dataset == 'reviews':
+            query = session.query(Review.id, Review.user_id, Review.movie_id, Review.rating, Review.review_text) \
+                .order_by(Review.id)
+            if user_id is not None:
+                query = query.filter(Review.user_id == str(user_id))
+        else:
+            query = session.query(CatalogMovie.id, CatalogMovie.imdb_id, CatalogMovie.title,
+                                  CatalogMovie.year, CatalogMovie.genre).order_by(CatalogMovie.id)
+            if user_id is not None:
+                query = query.join(Movie, Movie.catalog_id == CatalogMovie.id).filter(Movie.user_id == user_id)
+        return query
 
     def _delete_orphaned_favorite_movies(self):
       """
@@ -0,0 +1,181 @@
+from sqlalchemy import func, text
+
+from models.movie import Movie
+from models.review import Review
+from models.stats import MovieStats, GenreStats
+from models.user import UserFavoriteMovies
+
+
+def split_genres(genre):
+    """
+    Split a comma separated genre string such as 'Drama, Romance' into its genres.
+
+    Args:
+        genre (str): The genre string of a movie.
+
+    Returns:
+        list: The sorted, de-duplicated genre names.
+    """
+    if not genre:
+        return []
+    return sorted({part.strip() for part in genre.split(',') if part.strip()})
+
+
+def _upsert(model, key_column, counters):
+    """Build the statement that creates a rollup row or adds deltas to its counters."""
+    columns = [key_column.name, *counters, 'avg_rating']
+    values = [':key', *(f':{name}' for name in counters),
+              'CASE WHEN :review_count > 0 THEN :rating_sum * 1.0 / :review_count END']
+    updates = [f'{name} = {name} + excluded.{name}' for name in counters]
+    # The right-hand sides all see the row as it was before the update
+    updates.append('avg_rating = CASE WHEN review_count + excluded.review_count > 0 '
+                   'THEN (rating_sum + excluded.rating_sum) * 1.0 / (review_count + excluded.review_count) END')
+    return text(
+        f'INSERT INTO {model.__tablename__} ({", ".join(columns)}) VALUES ({", ".join(values)}) '
+        f'ON CONFLICT ({key_column.name}) DO UPDATE SET {", ".join(updates)}'
+    )
+
+
+# Plain SQL text, because SQLAlchemy 1.4 cannot cache a compiled on_conflict_do_update()
+# and would compile it again on every write
+_COUNTERS = {
+    MovieStats: ('library_count', 'favorites_count', 'review_count', 'rating_sum'),
+    GenreStats: ('movie_count', 'favorites_count', 'review_count', 'rating_sum'),
+}
+_UPSERTS = {
+    MovieStats: _upsert(MovieStats, MovieStats.catalog_id, _COUNTERS[MovieStats]),
+    GenreStats: _upsert(GenreStats, GenreStats.genre, _COUNTERS[GenreStats]),
+}
+
+
+def _bump(session, model, key, **deltas):
+    """Atomically add deltas to the counters of a rollup row, creating the row if needed."""
+    if not any(deltas.values()):
+        return
+    params = {name: deltas.get(name, 0) for name in _COUNTERS[model]}
+    params['key'] = key
+    session.execute(_UPSERTS[model], params)
+
+
+def movie_contribution(session, movie):
+    """
+    Compute what a movie row currently contributes to the rollups.
+
+    Args:
+        session: The SQLAlchemy session.
+        movie (Movie): The movie.
+
+    Returns:
+        dict: The 'favorites', 'reviews' and 'rating_sum' of the movie.
+    """
+    favorites = session.query(func.count()).select_from(UserFavoriteMovies) \
+        .filter(UserFavoriteMovies.movie_id == movie.id).scalar()
+    reviews, rating_sum = session.query(func.count(Review.id), func.coalesce(func.sum(Review.rating), 0)) \
+        .filter(Review.movie_id == movie.id).one()
+    return {'favorites': favorites, 'reviews': reviews, 'rating_sum': rating_sum}
+
+
+def record_movie(session, catalog_id, genre, sign, favorites=0, reviews=0, rating_sum=0):
+    """
+    Add (sign=1) or remove (sign=-1) a movie row and its favorites and reviews from the rollups.
+
+    Args:
+        session: The SQLAlchemy session of the write.
+        catalog_id (int): The ID of the catalog entry of the movie.
+        genre (str): The genre string of the movie.
+        sign (int): 1 when the movie is added, -1 when it is removed.
+        favorites (int): The number of favorites of the movie.
+        reviews (int): The number of reviews of the movie.
+        rating_sum (int): The sum of the review ratings of the movie.
+    """
+    _bump(session, MovieStats, catalog_id,
+          library_count=sign, favorites_count=sign * favorites,
+          review_count=sign * reviews, rating_sum=sign * rating_sum)
+    for name in split_genres(genre):
+        _bump(session, GenreStats, name,
+              movie_count=sign, favorites_count=sign * favorites,
+              review_count=sign * reviews, rating_sum=sign * rating_sum)
+
+    if sign < 0:
+        session.query(MovieStats).filter(MovieStats.catalog_id == catalog_id, MovieStats.library_count <= 0) \
+            .delete(synchronize_session=False)
+        session.query(GenreStats).filter(GenreStats.movie_count <= 0).delete(synchronize_session=False)
+
+
+def record_review(session, movie, count_delta, rating_delta):
+    """
+    Apply a change in the reviews of a movie to the rollups.
+
+    Args:
+        session: The SQLAlchemy session of the write.
+        movie (Movie): The reviewed movie.
+        count_delta (int): The change in the number of reviews.
+        rating_delta (int): The change in the sum of the ratings.
+    """
+    _bump(session, MovieStats, movie.catalog_id,
+          review_count=count_delta, rating_sum=rating_delta)
+    for name in split_genres(movie.genre):
+        _bump(session, GenreStats, name,
+              review_count=count_delta, rating_sum=rating_delta)
+
+
+def record_favorite(session, movie, sign):
+    """
+    Apply a favorite being added (sign=1) or removed (sign=-1) to the rollups.
+
+    Args:
+        session: The SQLAlchemy session of the write.
+        movie (Movie): The movie.
+        sign (int): 1 when the favorite is added, -1 when it is removed.
+    """
+    _bump(session, MovieStats, movie.catalog_id, favorites_count=sign)
+    for name in split_genres(movie.genre):
+        _bump(session, GenreStats, name, favorites_count=sign)
+
+
+def rebuild(session, batch_size=10000):
+    """
+    Recompute all rollup rows from the movies, reviews and favorites tables.
+
+    Args:
+        session: The SQLAlchemy session. The caller is responsible for committing.
+        batch_size (int): The number of movie rows fetched from the cursor at a time.
+    """
+    favorites = session.query(UserFavoriteMovies.movie_id, func.count().label('favorites')) \
+        .group_by(UserFavoriteMovies.movie_id).subquery()
+    reviews = session.query(Review.movie_id,
+                            func.count(Review.id).label('reviews'),
+                            func.coalesce(func.sum(Review.rating), 0).label('rating_sum')) \
+        .group_by(Review.movie_id).subquery()
+    rows = session.query(Movie.catalog_id, Movie.genre,
+                         func.coalesce(favorites.c.favorites, 0),
+                         func.coalesce(reviews.c.reviews, 0),
+                         func.coalesce(reviews.c.rating_sum, 0)) \
+        .outerjoin(favorites, favorites.c.movie_id == Movie.id) \
+        .outerjoin(reviews, reviews.c.movie_id == Movie.id)
+
+    movie_totals = {}
+    genre_totals = {}
+    for catalog_id, genre, favorite_count, review_count, rating_sum in rows.yield_per(batch_size):
+        totals = [(movie_totals, catalog_id)] + [(genre_totals, name) for name in split_genres(genre)]
+        for table, key in totals:
+            entry = table.setdefault(key, [0, 0, 0, 0])
+            entry[0] += 1
+            entry[1] += favorite_count
+            entry[2] += review_count
+            entry[3] += rating_sum
+
+    session.query(MovieStats).delete(synchronize_session=False)
+    session.query(GenreStats).delete(synchronize_session=False)
+    session.bulk_insert_mappings(MovieStats, [
+        {'catalog_id': catalog_id, 'library_count': count, 'favorites_count': favorite_count,
+         'review_count': review_count, 'rating_sum': rating_sum,
+         'avg_rating': rating_sum / review_count if review_count else None}
+        for catalog_id, (count, favorite_count, review_count, rating_sum) in movie_totals.items()
+    ])
+    session.bulk_insert_mappings(GenreStats, [
+        {'genre': genre, 'movie_count': count, 'favorites_count': favorite_count,
+         'review_count': review_count, 'rating_sum': rating_sum,
+         'avg_rating': rating_sum / review_count if review_count else None}
+        for genre, (count, favorite_count, review_count, rating_sum) in genre_totals.items()
+    ])
@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+
+def write_atomic(path, data):
+    """
+    Write a file under a temporary name and rename it, so readers never see half of it.
+
+    The file is readable by everyone, like a file written with open(), since
+    mkstemp() would otherwise leave it readable by its owner only.
+
+    Args:
+        path (str): The path of the file.
+        data (bytes): The content of the file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    with os.fdopen(handle, 'wb') as file:
+        file.write(data)
+    os.chmod(partial, 0o644)
+    os.replace(partial, path)
@@ -0,0 +1,40 @@
+"""
+Gunicorn configuration for MovieWeb App.
+
+Run with:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+The app is preloaded once in the master and forked into one worker per CPU core.
+Each worker gets its own SQLite connection pool after the fork (see
+SQLiteDataManager.reinit_after_fork). Requests mostly wait on SQLite and the OMDb
+API rather than burn CPU, so every worker also runs a few threads, each with its
+own scoped session. The OMDb quota is counted in the database, so all workers
+share one budget, and workers are not recycled since their caches are bounded.
+All settings can be overridden with environment variables.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the app (templates, models, data manager) once and share it copy-on-write
+preload_app = True
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Heartbeat files on tmpfs so a slow disk cannot stall the workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s forked with a fresh database connection pool", worker.pid)
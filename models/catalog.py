@@ -0,0 +1,49 @@
+import json
+
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.orm import relationship
+from database import Base
+
+class CatalogMovie(Base):
+    """
+    Represents a movie title in the shared 'catalog_movies' table of the database.
+
+    Every title is stored once, no matter how many users add it to their list, and
+    caches the OMDb response so that a title is only looked up upstream once.
+
+    Attributes:
+        id (int): The primary key for the catalog entry.
+        imdb_id (str): The OMDb imdbID (unique), or None for entries migrated without an OMDb lookup.
+        title (str): The canonical title of the movie (compared case-insensitively).
+        year (str): The release year reported by OMDb.
+        genre (str): The genre reported by OMDb.
+        details (str): The cached OMDb response as JSON.
+        fetched_at (datetime): When the OMDb response was fetched.
+        poster_hash (str): The digest of the cached poster thumbnail, '' if OMDb has no
+            poster, or None if it has not been fetched yet.
+        entries (relationship): A relationship to the users' 'Movie' entries of this title.
+    """
+
+    __tablename__ = 'catalog_movies'
+    id = Column(Integer, primary_key=True)
+    imdb_id = Column(String(20), unique=True)
+    title = Column(String(100, collation='NOCASE'), nullable=False, index=True)
+    year = Column(String(20))
+    genre = Column(String(100))
+    details = Column(Text)
+    fetched_at = Column(DateTime)
+    poster_hash = Column(String(64))
+    entries = relationship('Movie', back_populates='catalog')
+
+    @property
+    def poster_url(self):
+        """The poster URL from the cached OMDb response, or None."""
+        if not self.details:
+            return None
+        url = json.loads(self.details).get('Poster')
+        return url if url and url.startswith(('http://', 'https://')) else None
+
+    @property
+    def has_poster(self):
+        """Whether a poster thumbnail is or can be cached for this entry."""
+        return bool(self.poster_hash) or (self.poster_hash is None and self.poster_url is not None)
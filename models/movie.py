@@ -1,24 +1,35 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Movie(Base):
     """
-    Represents a movie in the 'movies' table of the database.
+    Represents a movie in a user's list in the 'movies' table of the database.
+
+    The title and OMDb data live in the shared catalog; a row here links a user to
+    a catalog entry and holds what is specific to that user.
 
     Attributes:
         id (int): The primary key for the movie.
-        title (str): The title of the movie.
-        genre (str): The genre of the movie.
         user_id (int): The ID of the user who added the movie (foreign key).
+        catalog_id (int): The ID of the shared catalog entry of the movie (foreign key).
+        genre (str): The genre of the movie as entered by the user.
+        title (str): The title of the catalog entry (read-only).
         user (relationship): A relationship to the 'User' object associated with the movie.
+        catalog (relationship): A relationship to the 'CatalogMovie' object of the movie.
         reviews (relationship): A relationship to the 'Review' objects associated with the movie.
     """
 
     __tablename__ = 'movies'
+    __table_args__ = (UniqueConstraint('user_id', 'catalog_id'),)
     id = Column(Integer, primary_key=True)
-    title = Column(String(100), nullable=False)
-    genre = Column(String(50))
     user_id = Column(Integer, ForeignKey('users.id'))
+    catalog_id = Column(Integer, ForeignKey('catalog_movies.id'), nullable=False)
+    genre = Column(String(50))
     user = relationship('User', back_populates='favorite_movies')
+    catalog = relationship('CatalogMovie', back_populates='entries', lazy='joined')
     reviews = relationship('Review', back_populates='movie')
+
+    @property
+    def title(self):
+        return self.catalog.title if self.catalog else None
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String
+from database import Base
+
+class ApiQuota(Base):
+    """
+    Represents a request counter of an external API in the 'api_quota' table.
+
+    Counting in the database lets every worker process share one budget, and the
+    counts survive restarts. Each row counts the requests of one fixed window.
+
+    Attributes:
+        name (str): The counter, e.g. 'omdb:day' (part of the primary key).
+        window (int): The number of the window since the epoch, i.e. the time
+            divided by the window length (part of the primary key).
+        used (int): The number of requests made in the window.
+    """
+
+    __tablename__ = 'api_quota'
+    name = Column(String(50), primary_key=True)
+    window = Column(Integer, primary_key=True)
+    used = Column(Integer, nullable=False, default=0)
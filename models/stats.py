@@ -0,0 +1,47 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from database import Base
+
+class MovieStats(Base):
+    """
+    Represents the rolled up statistics of a catalog title in the 'movie_stats' table.
+
+    The rows are maintained incrementally by the DataManager write paths and can be
+    rebuilt from scratch with the 'flask rebuild-stats' command.
+
+    Attributes:
+        catalog_id (int): The ID of the catalog entry of the movie (primary key).
+        library_count (int): The number of users who added the movie to their list.
+        favorites_count (int): The number of users who marked the movie as a favorite.
+        review_count (int): The number of reviews of the movie.
+        rating_sum (int): The sum of all review ratings of the movie.
+        avg_rating (float): The average review rating, or None without reviews.
+    """
+
+    __tablename__ = 'movie_stats'
+    catalog_id = Column(Integer, ForeignKey('catalog_movies.id'), primary_key=True)
+    library_count = Column(Integer, nullable=False, default=0, index=True)
+    favorites_count = Column(Integer, nullable=False, default=0, index=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    avg_rating = Column(Float, index=True)
+
+class GenreStats(Base):
+    """
+    Represents the rolled up statistics of a genre in the 'genre_stats' table.
+
+    Attributes:
+        genre (str): The genre name (primary key).
+        movie_count (int): The number of movies tagged with the genre.
+        favorites_count (int): The number of favorites of movies tagged with the genre.
+        review_count (int): The number of reviews of movies tagged with the genre.
+        rating_sum (int): The sum of the review ratings of movies tagged with the genre.
+        avg_rating (float): The average review rating, or None without reviews.
+    """
+
+    __tablename__ = 'genre_stats'
+    genre = Column(String(50), primary_key=True)
+    movie_count = Column(Integer, nullable=False, default=0, index=True)
+    favorites_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    avg_rating = Column(Float)
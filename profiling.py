@@ -0,0 +1,253 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request, template_rendered, before_render_template
+from itsdangerous import BadSignature, TimestampSigner
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_DIR = 'profiles'
+PROFILE_INTERVAL = 0.005
+PROFILE_HEADER = 'X-Profile'
+PROFILE_TOKEN_MAX_AGE = 24 * 3600
+
+# Where a sample's time is attributed, checked from the innermost frame outwards
+CATEGORIES = (
+    ('sql', ('sqlalchemy/engine', 'sqlalchemy/dialects', 'sqlalchemy/pool', 'sqlite3')),
+    ('orm', ('sqlalchemy',)),
+    ('templates', ('jinja2', 'markupsafe', 'templates')),
+    ('http', ('requests', 'urllib3', 'http/client', 'socket.py', 'ssl.py')),
+)
+
+
+class _Profile:
+    """The samples and timings collected for one request."""
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.timings = Counter()
+        self.pending = {}
+
+
+class Sampler:
+    """
+    A statistical profiler sampling the stacks of registered threads at a fixed interval.
+
+    One background thread reads the current frame of every thread being profiled
+    through sys._current_frames(), so a profiled request only pays for the stack
+    walk of its own samples and unprofiled requests pay nothing. While no thread
+    is being profiled the background thread sleeps until the next one starts.
+
+    Attributes:
+        interval (float): The number of seconds between samples.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._pid = None
+
+    def start(self, profile):
+        """Start sampling the thread of a profile."""
+        with self._lock:
+            self._profiles[profile.thread_id] = profile
+            self._wakeup.notify()
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name='profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, profile):
+        """Stop sampling the thread of a profile."""
+        with self._lock:
+            self._profiles.pop(profile.thread_id, None)
+
+    def _loop(self):
+        own = threading.get_ident()
+        while True:
+            with self._wakeup:
+                while not self._profiles:
+                    self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                frames = sys._current_frames()
+                for thread_id, profile in self._profiles.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own:
+                        self._record(profile, frame)
+
+    @staticmethod
+    def _record(profile, frame):
+        names = []
+        category = None
+        while frame is not None:
+            code = frame.f_code
+            filename = code.co_filename.replace('\\', '/')
+            if category is None:
+                for name, markers in CATEGORIES:
+                    if any(marker in filename for marker in markers):
+                        category = name
+                        break
+            names.append(f"{code.co_name} ({os.path.basename(filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        profile.stacks[';'.join(reversed(names))] += 1
+        profile.categories[category or 'app'] += 1
+
+
+class RequestProfiler:
+    """
+    Profiles selected Flask requests and writes a collapsed-stack file for each.
+
+    A request is profiled when profiling is enabled for all requests, when it is
+    picked at random with probability `rate`, or when it carries a valid signed
+    `X-Profile` header (see make_token()). For each profiled request two files are
+    written to `output_dir`: a .folded file in the collapsed-stack format read by
+    flamegraph.pl and speedscope, and a .json file with the route, the status,
+    the wall time, the measured SQL and template rendering time and the share of
+    samples spent in SQL, the ORM, templates, HTTP calls and the app itself.
+
+    Attributes:
+        output_dir (str): The directory the profiles are written to.
+        rate (float): The fraction of requests profiled at random.
+        secret (str): The key signing X-Profile tokens, or None to ignore the header.
+    """
+
+    def __init__(self, app=None, output_dir=PROFILE_DIR, rate=0.0, interval=PROFILE_INTERVAL,
+                 secret=None, always=False):
+        self.output_dir = output_dir
+        self.rate = rate
+        self.always = always
+        self.secret = secret
+        self.sampler = Sampler(interval)
+        self._local = threading.local()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the request hooks and the SQL and template timers on a Flask app."""
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+
+    def make_token(self):
+        """
+        Create a signed token for the X-Profile header.
+
+        Returns:
+            str: A token accepted for PROFILE_TOKEN_MAX_AGE seconds.
+        """
+        if not self.secret:
+            raise ValueError("Profiling tokens need a secret")
+        return TimestampSigner(self.secret, salt='profile').sign('profile').decode()
+
+    def _wanted(self):
+        token = request.headers.get(PROFILE_HEADER)
+        if token and self.secret:
+            try:
+                TimestampSigner(self.secret, salt='profile').unsign(token, max_age=PROFILE_TOKEN_MAX_AGE)
+                return True
+            except BadSignature:
+                pass
+        return self.always or (self.rate > 0 and random.random() < self.rate)
+
+    def _before_request(self):
+        if not self._wanted():
+            return
+        profile = _Profile(threading.get_ident())
+        g.profile = profile
+        self._local.profile = profile
+        self.sampler.start(profile)
+
+    def _after_request(self, response):
+        profile = g.get('profile')
+        if profile is not None:
+            response.headers['X-Profile-Id'] = self._name(profile, response.status_code)
+            profile.status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        self.sampler.stop(profile)
+        self._local.profile = None
+        try:
+            self._write(profile, getattr(profile, 'status', 500))
+        except OSError as e:
+            print("Writing the request profile failed:", e)
+
+    def _name(self, profile, status):
+        if not hasattr(profile, 'name'):
+            endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unknown')
+            stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+            profile.name = f"{stamp}-{endpoint}-{status}"
+        return profile.name
+
+    def _write(self, profile, status):
+        wall = time.perf_counter() - profile.started
+        samples = sum(profile.categories.values())
+        name = self._name(profile, status)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with open(os.path.join(self.output_dir, name + '.folded'), 'w') as folded:
+            for stack, count in profile.stacks.most_common():
+                folded.write(f"{stack} {count}\n")
+
+        summary = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': status,
+            'wall_ms': round(wall * 1000, 2),
+            'sql_ms': round(profile.timings['sql'] * 1000, 2),
+            'sql_queries': profile.timings['sql_queries'],
+            'render_ms': round(profile.timings['render'] * 1000, 2),
+            'samples': samples,
+            'interval_ms': self.sampler.interval * 1000,
+            'breakdown': {category: round(count / samples, 3) for category, count in
+                          profile.categories.most_common()} if samples else {},
+            'pid': os.getpid(),
+        }
+        with open(os.path.join(self.output_dir, name + '.json'), 'w') as metadata:
+            json.dump(summary, metadata, indent=2)
+
+    def _current(self):
+        return getattr(self._local, 'profile', None)
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = self._current()
+        if profile is not None:
+            profile.pending['render'] = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = self._current()
+        if profile is not None and 'render' in profile.pending:
+            profile.timings['render'] += time.perf_counter() - profile.pending.pop('render')
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = self._current()
+        if profile is not None:
+            profile.pending['sql'] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = self._current()
+        if profile is not None and 'sql' in profile.pending:
+            profile.timings['sql'] += time.perf_counter() - profile.pending.pop('sql')
+            profile.timings['sql_queries'] += 1
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# The tests import the app's top-level modules (app, database, datamanager, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py opens movieweb.db in the working directory when imported, so the tests
+# run in a scratch directory instead of next to a real database
+os.chdir(tempfile.mkdtemp(prefix='movieweb-tests-'))
+
+# The models refer to each other by name, so all of them must be loaded before
+# a test builds tables or sessions without importing the app
+import models.catalog, models.movie, models.quota, models.review, models.stats, models.user  # noqa: E402,F401
@@ -0,0 +1,11 @@
+import pytest
+
+from app import app
+
+
+@pytest.mark.parametrize('body', [{'ids': '12'}, {'ids': 12}, ['1', '2'], {'ids': [1, 'x']}])
+def test_movie_details_batch_rejects_invalid_ids(body):
+    response = app.test_client().post('/api/movie_details', json=body)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'ids must be a list of movie IDs'}
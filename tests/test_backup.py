@@ -0,0 +1,48 @@
+import os
+import sqlite3
+
+from datamanager.backup import BackupScheduler, list_snapshots
+
+
+def fork(child):
+    """Run a function in a forked process, which exits with 0 if it returns True."""
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            status = 0 if child() else 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def wait(pid):
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+def test_scheduled_snapshots_are_taken_by_one_worker(tmp_path):
+    db_path = str(tmp_path / 'live.db')
+    with sqlite3.connect(db_path) as connection:
+        connection.execute('CREATE TABLE movies (id INTEGER PRIMARY KEY, title TEXT)')
+        connection.execute("INSERT INTO movies (title) VALUES ('Heat')")
+    scheduler = BackupScheduler(db_path, interval=3600, dest_dir=str(tmp_path / 'backups'))
+
+    pids = [fork(lambda: scheduler.run_once() or True) for _ in range(3)]
+
+    assert [wait(pid) for pid in pids] == [0, 0, 0]
+    assert len(list_snapshots(str(tmp_path / 'backups'))) == 1
+
+
+def test_each_worker_starts_its_own_scheduler_thread(tmp_path):
+    scheduler = BackupScheduler(str(tmp_path / 'live.db'), interval=3600, dest_dir=str(tmp_path / 'backups'))
+    scheduler.start()
+    parent_thread = scheduler._thread
+
+    def child():
+        scheduler.start()
+        return scheduler._thread is not parent_thread and scheduler._thread.is_alive()
+
+    assert wait(fork(child)) == 0
+    scheduler.start()
+    assert scheduler._thread is parent_thread
+    scheduler.stop()
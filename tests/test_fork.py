@@ -0,0 +1,10 @@
+from app import app
+
+
+def test_forked_workers_serve_requests():
+    """Forked workers get their own connections and can all read and write the database."""
+    result = app.test_cli_runner().invoke(args=['fork-smoke', '--workers', '4', '--requests', '25'])
+
+    assert result.exit_code == 0, result.output
+    assert '4 workers served 100 requests' in result.output
+    assert '0 workers failed' in result.output
@@ -0,0 +1,116 @@
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import Base, configure_sqlite
+from datamanager.group_commit import GroupCommitter
+from models.user import User
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'group.db'}")
+    configure_sqlite(engine)
+    Base.metadata.create_all(engine)
+    engine.statements = []
+
+    @event.listens_for(engine, 'connect')
+    def trace(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(engine.statements.append)
+
+    return engine
+
+
+def add_user(email):
+    def operation(session):
+        user = User(name='Ann', email=email)
+        session.add(user)
+        session.flush()
+        return user.id
+    return operation
+
+
+def emails(engine):
+    with Session(engine) as session:
+        return sorted(email for (email,) in session.query(User.email))
+
+
+def commits(engine):
+    return sum(statement.upper() == 'COMMIT' for statement in engine.statements)
+
+
+def test_batch_commits_once(engine):
+    committer = GroupCommitter(sessionmaker(bind=engine), interval=0.2)
+
+    futures = [committer.submit(add_user(f"{i}@example.com")) for i in range(10)]
+
+    assert len({future.result(timeout=5) for future in futures}) == 10
+    assert len(emails(engine)) == 10
+    assert committer.counters['batches'] == 1
+    assert commits(engine) == 1
+
+
+def test_failing_operation_is_rolled_back_alone(engine):
+    committer = GroupCommitter(sessionmaker(bind=engine), interval=0.2)
+
+    futures = [committer.submit(add_user(email)) for email in
+               ('a@example.com', 'b@example.com', 'a@example.com', 'c@example.com')]
+
+    with pytest.raises(IntegrityError):
+        futures[2].result(timeout=5)
+    for future in futures[:2] + futures[3:]:
+        future.result(timeout=5)
+    assert emails(engine) == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert committer.counters['retried_batches'] == 0
+    assert commits(engine) == 1
+
+
+def test_failed_commit_is_retried_per_operation(engine):
+    failures = []
+
+    class FlakySession(Session):
+        def commit(self):
+            if not failures:
+                failures.append(True)
+                raise RuntimeError('disk full')
+            super().commit()
+
+    committer = GroupCommitter(sessionmaker(bind=engine, class_=FlakySession), interval=0.2)
+
+    futures = [committer.submit(add_user(f"{i}@example.com")) for i in range(3)]
+
+    assert all(future.result(timeout=5) for future in futures)
+    assert len(emails(engine)) == 3
+    assert committer.counters['retried_batches'] == 1
+    assert committer.counters['commits'] == 3
+
+
+def test_timed_out_operation_is_withdrawn(engine):
+    committer = GroupCommitter(sessionmaker(bind=engine), interval=0.001)
+    release = threading.Event()
+    blocker = committer.submit(lambda session: release.wait(5))
+    time.sleep(0.05)
+
+    with pytest.raises(TimeoutError):
+        committer.run(add_user('late@example.com'), timeout=0.05)
+    release.set()
+    blocker.result(timeout=5)
+    committer.run(add_user('next@example.com'))
+
+    assert emails(engine) == ['next@example.com']
+
+
+def test_started_operation_is_waited_for(engine):
+    committer = GroupCommitter(sessionmaker(bind=engine), interval=0.001)
+
+    def slow(session):
+        time.sleep(0.2)
+        return add_user('slow@example.com')(session)
+
+    assert committer.run(slow, timeout=0.05)
+    assert emails(engine) == ['slow@example.com']
@@ -0,0 +1,56 @@
+from sqlalchemy import create_engine, text
+
+from datamanager import migrations
+from models.catalog import CatalogMovie
+
+LEGACY_SCHEMA = [
+    'CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL, email VARCHAR(100) NOT NULL UNIQUE)',
+    'CREATE TABLE movies (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, genre VARCHAR(50), '
+    'user_id INTEGER REFERENCES users (id))',
+    'CREATE TABLE reviews (id INTEGER PRIMARY KEY, user_id VARCHAR NOT NULL REFERENCES users (id), '
+    'movie_id INTEGER NOT NULL REFERENCES movies (id), review_text VARCHAR, rating INTEGER)',
+    'CREATE TABLE user_favorite_movies (user_id INTEGER REFERENCES users (id), '
+    'movie_id INTEGER REFERENCES movies (id), PRIMARY KEY (user_id, movie_id))',
+]
+
+
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO users (id, name, email) VALUES "
+                                "(1, 'Ann', 'ann@example.com'), (2, 'Bob', 'bob@example.com')"))
+        connection.execute(text("INSERT INTO movies (id, title, genre, user_id) VALUES "
+                                "(1, 'Titanic', 'Drama', 1), (2, ' titanic', 'Romance', 1), "
+                                "(3, 'TITANIC', 'Drama', 2), (4, 'Heat', 'Crime', 2)"))
+        connection.execute(text("INSERT INTO reviews (id, user_id, movie_id, review_text, rating) VALUES "
+                                "(1, '1', 2, 'Too long', 6)"))
+        connection.execute(text("INSERT INTO user_favorite_movies (user_id, movie_id) VALUES "
+                                "(1, 1), (1, 2), (2, 4)"))
+    CatalogMovie.__table__.create(engine)
+    return engine
+
+
+def test_migration_merges_duplicate_titles(tmp_path):
+    engine = legacy_engine(tmp_path)
+
+    assert migrations.migrate_shared_catalog(engine) == {'catalog': 2, 'merged': 1}
+
+    with engine.connect() as connection:
+        catalog = dict(connection.execute(text('SELECT title, id FROM catalog_movies')).fetchall())
+        assert set(catalog) == {'Titanic', 'Heat'}
+        movies = connection.execute(text('SELECT id, user_id, catalog_id FROM movies ORDER BY id')).fetchall()
+        assert [tuple(movie) for movie in movies] == [
+            (1, 1, catalog['Titanic']), (3, 2, catalog['Titanic']), (4, 2, catalog['Heat'])]
+        assert connection.execute(text('SELECT movie_id FROM reviews')).scalar() == 1
+        favorites = connection.execute(text('SELECT user_id, movie_id FROM user_favorite_movies ORDER BY 1, 2'))
+        assert [tuple(favorite) for favorite in favorites] == [(1, 1), (2, 4)]
+
+
+def test_migration_runs_once(tmp_path):
+    engine = legacy_engine(tmp_path)
+    migrations.migrate_shared_catalog(engine)
+
+    assert not migrations.needs_catalog_migration(engine)
+    assert migrations.migrate_shared_catalog(engine) is None
@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine
+
+from database import Base
+from datamanager.omdb import DAY, SharedQuota
+
+
+def test_shared_quota_enforces_every_limit(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'quota.db'}")
+    Base.metadata.create_all(engine)
+    now = [DAY * 100 + 10.0]
+    limits = [('day', DAY, 3), ('second', 1, 2)]
+    # Two clients stand for two worker processes sharing the database
+    first, second = (SharedQuota(engine, clock=lambda: now[0]) for _ in range(2))
+
+    assert first.try_acquire(limits) == (True, None)
+    assert second.try_acquire(limits) == (True, None)
+    assert first.try_acquire(limits) == (False, 'second')
+
+    now[0] += 1
+    assert second.try_acquire(limits) == (True, None)
+    assert first.try_acquire(limits) == (False, 'day')
+    assert first.used('day', DAY) == 3
+
+    now[0] += DAY
+    assert first.try_acquire(limits) == (True, None)
+    assert second.used('day', DAY) == 1
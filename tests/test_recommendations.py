@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from datamanager.recommendations import RecommendationEngine
+
+
+def random_favorites(rng, users=60, items=40, per_user=6):
+    return {(user, item) for user in range(users) for item in rng.sample(range(items), rng.randint(1, per_user))}
+
+
+def scores(engine):
+    """The neighbor scores of every item, ignoring how ties were ordered."""
+    return {item: sorted(round(score, 9) for _, score in neighbors) for item, neighbors in engine.neighbors.items()}
+
+
+@pytest.mark.parametrize('top_k', [5, 100])
+def test_incremental_updates_match_a_full_build(top_k):
+    rng = random.Random(top_k)
+    favorites = random_favorites(rng)
+    incremental = RecommendationEngine(top_k=top_k, batch_size=7)
+    incremental.build(sorted(favorites))
+
+    for _ in range(400):
+        pair = (rng.randrange(60), rng.randrange(45))
+        if pair in favorites and rng.random() < 0.5:
+            favorites.discard(pair)
+            incremental.remove_favorite(*pair)
+        else:
+            favorites.add(pair)
+            incremental.add_favorite(*pair)
+
+    full = RecommendationEngine(top_k=top_k, batch_size=7)
+    full.build(sorted(favorites))
+
+    assert scores(incremental) == scores(full)
+    if top_k == 100:
+        # Nothing is cut off, so the neighbor lists hold the same items
+        assert {item: {other: pytest.approx(score) for other, score in neighbors}
+                for item, neighbors in incremental.neighbors.items()} == \
+               {item: dict(neighbors) for item, neighbors in full.neighbors.items()}
+
+
+def test_recommendation_scores_are_averages():
+    engine = RecommendationEngine()
+    engine.build([(1, 'a'), (1, 'b'), (2, 'a'), (2, 'b'), (2, 'c'), (3, 'a'), (3, 'c')])
+
+    recommended = engine.recommend(1)
+
+    assert [item for item, score in recommended] == ['c']
+    assert 0 < recommended[0][1] <= 1
@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+
+from app import app, data_manager
+from models.catalog import CatalogMovie
+from models.movie import Movie
+from models.review import Review
+from models.user import User
+
+
+@pytest.fixture
+def thread():
+    """Two users with the same movie, and a review of it by the first one."""
+    session = data_manager.session_factory()
+    catalog = CatalogMovie(title=f"Heat {uuid.uuid4().hex}")
+    author, other = (User(name=name, email=f"{uuid.uuid4().hex}@example.com") for name in ('Ann', 'Bob'))
+    session.add_all([catalog, author, other])
+    session.flush()
+    author_movie = Movie(user_id=author.id, catalog_id=catalog.id, genre='Crime')
+    other_movie = Movie(user_id=other.id, catalog_id=catalog.id, genre='Crime')
+    session.add_all([author_movie, other_movie])
+    session.flush()
+    review = Review(user_id=str(author.id), movie_id=author_movie.id, review_text='Great', rating=9)
+    session.add(review)
+    session.commit()
+    ids = {'author': author.id, 'other': other.id, 'author_movie': author_movie.id,
+           'other_movie': other_movie.id, 'review': review.id}
+    session.close()
+    yield ids
+    data_manager.close_session()
+
+
+def stored_review(review_id):
+    session = data_manager.session_factory()
+    try:
+        review = session.query(Review).get(review_id)
+        return review and (review.review_text, review.rating)
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize('action', ['update_review', 'delete_review'])
+@pytest.mark.parametrize('movie, status', [('other_movie', 404), ('author_movie', 403)])
+def test_users_cannot_change_reviews_of_others(thread, action, movie, status):
+    client = app.test_client()
+    url = f"/users/{thread['other']}/movies/{thread[movie]}/{action}/{thread['review']}"
+
+    response = client.post(url, data={'review_text': 'Boring', 'rating': '1'})
+
+    assert response.status_code == status
+    assert stored_review(thread['review']) == ('Great', 9)
+
+
+def test_author_can_update_and_delete_review(thread):
+    client = app.test_client()
+    prefix = f"/users/{thread['author']}/movies/{thread['author_movie']}"
+
+    response = client.post(f"{prefix}/update_review/{thread['review']}", data={'review_text': 'Good', 'rating': '7'})
+    assert response.status_code == 302
+    assert stored_review(thread['review']) == ('Good', 7)
+
+    response = client.post(f"{prefix}/delete_review/{thread['review']}")
+    assert response.status_code == 302
+    assert stored_review(thread['review']) is None
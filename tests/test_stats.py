@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import Base
+from datamanager import stats
+from models.stats import GenreStats, MovieStats
+
+
+def test_rollup_upserts_add_deltas_and_averages(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(engine)
+    movie = SimpleNamespace(catalog_id=1, genre='Drama, Crime')
+
+    with Session(engine) as session:
+        stats.record_movie(session, movie.catalog_id, movie.genre, 1)
+        stats.record_review(session, movie, 1, 8)
+        stats.record_review(session, movie, 1, 5)
+        stats.record_favorite(session, movie, 1)
+        assert session.query(MovieStats.library_count, MovieStats.favorites_count,
+                             MovieStats.review_count, MovieStats.avg_rating).one() == (1, 1, 2, 6.5)
+        assert dict(session.query(GenreStats.genre, GenreStats.avg_rating)) == {'Crime': 6.5, 'Drama': 6.5}
+
+        stats.record_review(session, movie, -2, -13)
+        assert session.query(MovieStats.review_count, MovieStats.avg_rating).one() == (0, None)
+
+
+def test_rollup_upserts_are_cached():
+    # SQLAlchemy only reuses the compiled form of statements that have a cache key
+    assert all(statement._generate_cache_key() is not None for statement in stats._UPSERTS.values())
@@ -0,0 +1,18 @@
+"""
+WSGI entry point for running MovieWeb App under a multi-process server.
+
+Example:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+The data manager disposes its connection pool and session after a fork, so the
+app can be preloaded in the master process and shared by all workers. The static
+assets are built and the templates compiled here, before the fork, so no worker
+compiles a template on its first request.
+"""
+from app import app, static_assets
+from assets import precompile_templates
+
+static_assets.build()
+precompile_templates(app)
+
+application = app